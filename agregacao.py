@@ -0,0 +1,113 @@
+import threading
+import time
+import numpy as np
+from gerador import FIELDS, FIELD_LIMITS
+
+SKETCH_BINS = 32  # Histograma por bucket usado como sketch de quantis
+
+# (resolução em segundos, buckets mantidos): 1 h de 1 s, 1 dia de 1 min, 90 dias de 1 h
+DEFAULT_TIERS = ((1, 3600), (60, 1440), (3600, 2160))
+
+class RollupTier:
+    """Agregados por bucket (count, sum, min, max, sketch) em arrays circulares de tamanho fixo"""
+
+    def __init__(self, resolution, retention):
+        self.resolution = resolution
+        self.retention = retention
+        fields = len(FIELDS)
+        self.bucket_ids = np.full(retention, -1, dtype=np.int64)
+        self.count = np.zeros(retention, dtype=np.int64)
+        self.sum = np.zeros((retention, fields))
+        self.min = np.full((retention, fields), np.inf)
+        self.max = np.full((retention, fields), -np.inf)
+        self.sketch = np.zeros((retention, fields, SKETCH_BINS), dtype=np.uint32)
+
+    def update(self, timestamps, values, bins):
+        ids = (timestamps // self.resolution).astype(np.int64)
+        slots = ids % self.retention
+
+        # Buckets novos ocupam a posição de buckets que saíram da retenção
+        new_ids = np.unique(ids)
+        new_slots = new_ids % self.retention
+        reset = new_slots[new_ids > self.bucket_ids[new_slots]]
+        self.bucket_ids[new_slots] = np.maximum(self.bucket_ids[new_slots], new_ids)
+        self.count[reset] = 0
+        self.sum[reset] = 0.0
+        self.min[reset] = np.inf
+        self.max[reset] = -np.inf
+        self.sketch[reset] = 0
+
+        # Amostras mais antigas que a retenção são descartadas
+        keep = self.bucket_ids[slots] == ids
+        slots, values, bins = slots[keep], values[keep], bins[keep]
+        np.add.at(self.count, slots, 1)
+        np.add.at(self.sum, slots, values)
+        np.minimum.at(self.min, slots, values)
+        np.maximum.at(self.max, slots, values)
+        np.add.at(self.sketch, (slots[:, None], np.arange(len(FIELDS))[None, :], bins), 1)
+
+    def query(self, field_index, start_time, end_time, quantiles):
+        first, last = int(start_time // self.resolution), int(end_time // self.resolution)
+        slots = np.nonzero((self.bucket_ids >= first) & (self.bucket_ids <= last) & (self.count > 0))[0]
+        slots = slots[np.argsort(self.bucket_ids[slots])]
+
+        count = self.count[slots]
+        result = {
+            "start": (self.bucket_ids[slots] * self.resolution).tolist(),
+            "count": count.tolist(),
+            "mean": (self.sum[slots, field_index] / count).tolist(),
+            "min": self.min[slots, field_index].tolist(),
+            "max": self.max[slots, field_index].tolist()
+        }
+
+        # Quantis aproximados pelo ponto médio do bin do histograma
+        low, high = FIELD_LIMITS[FIELDS[field_index]]
+        width = (high - low) / SKETCH_BINS
+        cumulative = np.cumsum(self.sketch[slots, field_index], axis=1)
+        for q in quantiles:
+            target = np.maximum(1, np.ceil(q * count))[:, None]
+            bin_index = np.argmax(cumulative >= target, axis=1)
+            result[f"p{round(q * 100)}"] = (low + (bin_index + 0.5) * width).tolist()
+        return result
+
+class RollupStore:
+    """Camadas de agregação atualizadas a cada bloco de leituras"""
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = [RollupTier(resolution, retention) for resolution, retention in sorted(tiers)]
+        self.low = np.array([FIELD_LIMITS[f][0] for f in FIELDS])
+        self.high = np.array([FIELD_LIMITS[f][1] for f in FIELDS])
+        self.lock = threading.Lock()
+
+    def update(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        bins = ((values - self.low) / (self.high - self.low) * SKETCH_BINS).astype(np.int64)
+        bins = np.clip(bins, 0, SKETCH_BINS - 1)
+        with self.lock:
+            for tier in self.tiers:
+                tier.update(timestamps, values, bins)
+
+    def pick_tier(self, resolution, start_time, now=None):
+        """A camada mais grossa que atende a resolução e ainda guarda start_time
+
+        Se nenhuma dessas alcança start_time, sobe para a camada mais fina que alcance
+        (resolução maior que a pedida); sem nenhuma, usa a de maior retenção.
+        """
+        now = time.time() if now is None else now
+        covering = [t for t in self.tiers if now - t.resolution * t.retention <= start_time]
+        eligible = [t for t in covering if t.resolution <= resolution]
+        if eligible:
+            return eligible[-1]
+        if covering:
+            return covering[0]
+        return max(self.tiers, key=lambda t: t.resolution * t.retention)
+
+    def query(self, field, start_time, end_time, resolution, quantiles=(0.5, 0.95)):
+        now = time.time()
+        tier = self.pick_tier(resolution, start_time, now)
+        with self.lock:
+            buckets = tier.query(FIELDS.index(field), start_time, end_time, quantiles)
+        covered_from = now - tier.resolution * tier.retention
+        return {"resolution": tier.resolution, "buckets": buckets,
+                "truncated": start_time < covered_from, "covered_from": covered_from}
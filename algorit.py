@@ -1,7 +1,9 @@
+from collections import deque
+
 class LamportClock:
-    def __init__(self):
+    def __init__(self, max_events=1024):
         self.time = 0
-        self.pending_events = []
+        self.pending_events = deque(maxlen=max_events)  # Só os eventos mais recentes
         
     def increment(self):
         self.time += 1
@@ -17,7 +19,7 @@ class LamportClock:
         return self.time
         
     def get_events(self):
-        return self.pending_events.copy()
+        return list(self.pending_events)
         
     def clear_events(self):
-        self.pending_events = []
\ No newline at end of file
+        self.pending_events.clear()
\ No newline at end of file
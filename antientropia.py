@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+
+BUCKET_MS = 60000  # Cada folha cobre um canal em um intervalo de 1 minuto
+TREE_DEPTH = 10    # 2^10 posições de folha na árvore
+
+class MerkleIndex:
+    """Resumos por (canal, intervalo de tempo), recalculados só onde houve escrita"""
+
+    def __init__(self, depth=TREE_DEPTH, bucket_ms=BUCKET_MS):
+        self.depth = depth
+        self.bucket_ms = bucket_ms
+        self.leaves = {}    # (canal, bucket) -> (digest, posição na árvore)
+        self.dirty = set()  # Folhas alteradas desde o último refresh
+        self.generation = 0  # Muda sempre que alguma folha muda (invalida árvores em cache)
+        self.lock = threading.Lock()
+
+    def bucket(self, ts):
+        return int(ts) // self.bucket_ms
+
+    def mark_dirty(self, channel, timestamps):
+        with self.lock:
+            self.dirty.update((channel, self.bucket(ts)) for ts in timestamps)
+
+    def mark_channel_dirty(self, channel):
+        with self.lock:
+            self.dirty.update(key for key in self.leaves if key[0] == channel)
+
+    def refresh(self, channels):
+        """Recalcula as folhas sujas a partir de {canal: {ts: valor}} (chamar com o lock dos canais)"""
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        if dirty:
+            self.generation += 1
+
+        by_channel = {}
+        for channel, bucket in dirty:
+            by_channel.setdefault(channel, set()).add(bucket)
+
+        for channel, buckets in by_channel.items():
+            # Uma passada pelo canal agrupa as leituras dos intervalos alterados
+            grouped = {b: [] for b in buckets}
+            for ts, value in channels.get(channel, {}).items():
+                readings = grouped.get(self.bucket(ts))
+                if readings is not None:
+                    readings.append((ts, value))
+            for bucket, readings in grouped.items():
+                if readings:
+                    key = (channel, bucket)
+                    self.leaves[key] = (self.digest(readings), self.slot(key))
+                else:
+                    self.leaves.pop((channel, bucket), None)
+
+    @staticmethod
+    def digest(readings):
+        return hashlib.sha1(";".join(f"{ts}:{value!r}" for ts, value in sorted(readings)).encode()).hexdigest()
+
+    def slot(self, key):
+        return int(hashlib.sha1(f"{key[0]}|{key[1]}".encode()).hexdigest(), 16) % (1 << self.depth)
+
+    def slot_leaves(self, include):
+        """Folhas dos canais aceitos por include(canal), agrupadas por posição"""
+        slots = {}
+        included = {}  # Decisão por canal, não por folha
+        for (channel, bucket), (digest, slot) in self.leaves.items():
+            if channel not in included:
+                included[channel] = include(channel)
+            if included[channel]:
+                slots.setdefault(slot, []).append([channel, bucket, digest])
+        return slots
+
+    def build(self, include):
+        """Níveis da árvore: levels[0] é a raiz, levels[depth] são as posições das folhas"""
+        slots = self.slot_leaves(include)
+        level = []
+        for i in range(1 << self.depth):
+            leaves = sorted(slots.get(i, []))
+            level.append(hashlib.sha1("".join(f"{c}|{b}|{d}" for c, b, d in leaves).encode()).hexdigest()
+                         if leaves else "")
+        levels = [level]
+        while len(level) > 1:
+            level = [hashlib.sha1((level[i] + level[i + 1]).encode()).hexdigest()
+                     if level[i] or level[i + 1] else ""
+                     for i in range(0, len(level), 2)]
+            levels.insert(0, level)
+        return levels, slots
+
+class BandwidthLimiter:
+    """Balde de fichas: limita os bytes por segundo gastos na reconciliação"""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.tokens = bytes_per_second
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self, size):
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
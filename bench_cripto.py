@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+import time
+from security import CryptoPool, SecurityHandler
+
+# Mensagens típicas do tráfego entre nós (respostas de GET_DATA e lotes de replicação)
+SIZES = (256, 4096, 65536)
+MESSAGES = 2000
+# Como no sensor: várias threads de atendimento chamando encrypt()/decrypt() ao mesmo tempo
+CALLERS = int(os.getenv('REQUEST_WORKERS', 8))
+
+def measure(pool, payloads):
+    """Cada thread cifra e decifra sua parte das mensagens, uma chamada por mensagem"""
+    def call(part):
+        for payload in part:
+            pool.decrypt(pool.encrypt(payload))
+
+    threads = [threading.Thread(target=call, args=(payloads[i::CALLERS],)) for i in range(CALLERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return len(payloads) / elapsed, sum(len(p) for p in payloads) / elapsed / 1e6
+
+def main():
+    cores = os.cpu_count() or 1
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else cores
+    security = SecurityHandler(0, "bench")
+    print(f"Núcleos disponíveis: {cores}, threads chamando o pool: {CALLERS}")
+    if cores == 1:
+        print("Aviso: com um só núcleo não há ganho esperado; rode numa máquina com mais núcleos")
+    print(f"{'modo':<8} {'workers':>7} {'tamanho':>8} {'msg/s':>10} {'MB/s':>8} {'escala':>7}")
+
+    for mode in ("thread", "process"):
+        for size in SIZES:
+            payloads = ["x" * size] * (MESSAGES if size < 65536 else MESSAGES // 10)
+            baseline = None
+            for workers in range(1, max_workers + 1):
+                pool = CryptoPool(security, workers, mode)
+                pool.decrypt(pool.encrypt(payloads[0]))  # Aquece o pool antes de medir
+                rate, mbps = measure(pool, payloads)
+                pool.shutdown()
+                baseline = baseline or rate
+                print(f"{mode:<8} {workers:>7} {size:>8} {rate:>10.0f} {mbps:>8.1f} {rate / baseline:>6.2f}x")
+
+if __name__ == "__main__":
+    main()
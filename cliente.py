@@ -1,7 +1,12 @@
 import socket
+import io
 import json
+import os
+import struct
 import time
 import random
+import numpy as np
+from particao import ConsistentHashRing
 from security import SecurityHandler
 
 class Cliente:
@@ -13,6 +18,8 @@ class Cliente:
         ]
         self.security = SecurityHandler(0, "chave_32_bytes_ultra_secreta_1234567890")
         self.timeout = 2  # Timeout de conexão em segundos
+        self.data_cache = {}  # Última leitura conhecida por sensor (versionada)
+        self.ring = None  # Mapa de partições em cache para rotear canais lógicos
 
     def send_command(self, sensor, command, data=None):
         """Envia comandos aos sensores com tratamento robusto"""
@@ -27,14 +34,217 @@ class Cliente:
                     
                 encrypted = self.security.encrypt(json.dumps(payload))
                 s.sendall(encrypted.encode())
+                s.shutdown(socket.SHUT_WR)  # Sinaliza o fim da mensagem
                 
-                response = s.recv(4096)
+                chunks = []
+                while True:
+                    chunk = s.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                response = b"".join(chunks)
                 if response:
                     return json.loads(self.security.decrypt(response.decode()))
         except Exception as e:
             print(f"Erro ao comunicar com sensor {sensor['id']}: {str(e)}")
         return None
 
+    def get_data(self, sensor):
+        """Leitura condicional: envia a versão em cache e recebe só o que mudou"""
+        cached = self.data_cache.get(sensor["id"])
+        known_version = cached["data"]["version"] if cached else 0
+        
+        response = self.send_command(sensor, "GET_DATA_IF_NEWER", {"version": known_version})
+        if not response:
+            return None
+            
+        status = response.get("status")
+        if status == "NOT_MODIFIED" and cached:
+            return cached
+        if status == "DELTA" and cached:
+            cached["data"].update(response.get("changes", {}))
+            cached["data"]["version"] = response["version"]
+            return cached
+        if "data" in response:
+            self.data_cache[sensor["id"]] = response
+            return response
+        return None
+
+    def refresh_partition_map(self):
+        """Obtém o mapa de partições de qualquer sensor disponível"""
+        for sensor in self.sensors:
+            response = self.send_command(sensor, "PARTITION_MAP")
+            if response and "partition_map" in response:
+                self.ring = ConsistentHashRing.from_dict(response["partition_map"])
+                return True
+        return False
+
+    def channel_command(self, channel, command, data=None):
+        """Roteia um comando de canal pelo mapa em cache, atualizando-o se estiver velho"""
+        payload = {"channel": channel}
+        if data:
+            payload.update(data)
+            
+        for _ in range(2):
+            if self.ring is None and not self.refresh_partition_map():
+                return None
+                
+            for node_id in self.ring.preference_list(channel):
+                sensor = next((s for s in self.sensors if s["id"] == node_id), None)
+                response = self.send_command(sensor, command, payload) if sensor else None
+                if not response:
+                    continue  # Tenta a próxima réplica
+                if response.get("status") == "WRONG_NODE":
+                    break
+                return response
+                
+            # Mapa desatualizado ou nenhuma réplica respondeu
+            self.ring = None
+        return None
+
+    def put_channel(self, channel, readings):
+        """Grava leituras [timestamp_ms, valor] em um canal lógico"""
+        return self.channel_command(channel, "CHANNEL_PUT", {"readings": readings})
+
+    def get_channel(self, channel, since=0):
+        return self.channel_command(channel, "CHANNEL_GET", {"since": since})
+
+    def query_channel(self):
+        """Consulta as leituras de um canal lógico"""
+        print("\n=== CONSULTAR CANAL LÓGICO ===")
+        channel = input("Nome do canal: ").strip()
+        response = self.get_channel(channel)
+        if not response:
+            print("Canal indisponível")
+            return
+            
+        readings = response.get("readings", [])
+        print(f"Canal {channel}: {len(readings)} leituras (réplicas: {self.ring.preference_list(channel)})")
+        for ts, value in readings[-10:]:
+            print(f" {time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(ts / 1000))}: {value}")
+
+    def query_trend(self):
+        """Tendência agregada de um campo (usa as camadas de rollup do sensor)"""
+        print("\n=== TENDÊNCIA AGREGADA ===")
+        try:
+            sensor_id = int(input("Digite o ID do sensor (1-3): "))
+            sensor = next(s for s in self.sensors if s["id"] == sensor_id)
+            field = input("Campo (temperature/humidity/pressure): ").strip()
+            hours = float(input("Período em horas: "))
+            points = int(input("Número aproximado de pontos: ") or 60)
+        except (ValueError, StopIteration):
+            print("Entrada inválida!")
+            return
+            
+        end = time.time()
+        response = self.send_command(sensor, "ROLLUP_QUERY", {
+            "field": field, "start": end - hours * 3600, "end": end,
+            "resolution": hours * 3600 / max(points, 1)
+        })
+        if not response or response.get("status") != "OK":
+            print("Consulta indisponível")
+            return
+            
+        buckets = response["buckets"]
+        print(f"Resolução usada: {response['resolution']}s ({len(buckets['start'])} buckets)")
+        for i, start in enumerate(buckets["start"]):
+            print(f" {time.strftime('%d/%m %H:%M:%S', time.localtime(start))}  "
+                  f"média {buckets['mean'][i]:.1f}  min {buckets['min'][i]:.1f}  "
+                  f"max {buckets['max'][i]:.1f}  p95 {buckets['p95'][i]:.1f}")
+
+    def register_rule(self):
+        """Registra uma regra de alerta contínua em todos os sensores"""
+        print("\n=== REGISTRAR REGRA DE ALERTA ===")
+        print("1. Limiar por duração (ex.: humidity > 85 por 30s)")
+        print("2. Variação na janela (ex.: queda de pressure > 5 em 600s)")
+        try:
+            choice = input("Tipo de regra: ").strip()
+            field = input("Campo (temperature/humidity/pressure): ").strip()
+            if choice == "1":
+                rule = {"type": "threshold", "field": field, "op": input("Operador (>, >=, <, <=): ").strip(),
+                        "value": float(input("Limiar: ")), "for": float(input("Duração (s): "))}
+            elif choice == "2":
+                rule = {"type": "change", "field": field, "direction": input("Direção (drop/rise): ").strip(),
+                        "amount": float(input("Variação: ")), "window": float(input("Janela (s): "))}
+            else:
+                print("Opção inválida!")
+                return
+        except ValueError:
+            print("Entrada inválida! Digite um número.")
+            return
+            
+        for sensor in self.sensors:
+            response = self.send_command(sensor, "RULE_ADD", {"rule": rule})
+            if response and response.get("status") == "OK":
+                print(f"Sensor {sensor['id']}: regra {response['rule_id']} registrada")
+            else:
+                print(f"Sensor {sensor['id']}: {response.get('error') if response else 'offline'}")
+
+    def export_history(self, sensor, start, end, directory):
+        """Exporta o histórico de um sensor para um .npy por campo, bloco a bloco"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(self.timeout)
+            s.connect((sensor["host"], sensor["port"]))
+            request = {"command": "EXPORT", "start": start, "end": end}
+            s.sendall(self.security.encrypt(json.dumps(request)).encode())
+            s.shutdown(socket.SHUT_WR)
+            
+            stream = s.makefile("rb")
+            columns, offsets = {}, {}
+            while True:
+                header = stream.read(4)
+                if len(header) < 4:
+                    raise Exception("Exportação interrompida")
+                frame = self.security.decrypt_bytes(stream.read(struct.unpack("!I", header)[0]))
+                
+                if frame[:1] == b"N":
+                    name = frame[2:2 + frame[1]].decode()
+                    block = np.load(io.BytesIO(frame[2 + frame[1]:]))
+                    column, offset = columns[name], offsets[name]
+                    block = block[:len(column) - offset]
+                    column[offset:offset + len(block)] = block
+                    offsets[name] += len(block)
+                    continue
+                    
+                message = json.loads(frame[1:])
+                if message["type"] == "header":
+                    # Arquivos mapeados em memória: o uso de memória não cresce com o tamanho
+                    os.makedirs(directory, exist_ok=True)
+                    for name in message["fields"]:
+                        columns[name] = np.lib.format.open_memmap(
+                            os.path.join(directory, f"{name}.npy"), mode="w+",
+                            dtype=np.float64, shape=(message["rows"],))
+                        offsets[name] = 0
+                elif message["type"] == "end":
+                    rows = min(offsets.values(), default=0)
+                    for name, column in columns.items():
+                        column.flush()
+                        if rows < len(column):
+                            # Linhas sobrescritas no sensor durante a exportação: corta o arquivo
+                            path = os.path.join(directory, f"{name}.npy")
+                            np.save(path + ".tmp.npy", column[:rows])
+                            os.replace(path + ".tmp.npy", path)
+                    return rows
+
+    def export_cluster(self):
+        """Exporta o histórico de todos os sensores em um intervalo"""
+        print("\n=== EXPORTAR HISTÓRICO ===")
+        try:
+            hours = float(input("Últimas quantas horas? "))
+        except ValueError:
+            print("Entrada inválida! Digite um número.")
+            return
+        directory = input("Diretório de destino [export]: ").strip() or "export"
+        
+        end = time.time()
+        for sensor in self.sensors:
+            try:
+                rows = self.export_history(sensor, end - hours * 3600, end,
+                                           os.path.join(directory, f"sensor{sensor['id']}"))
+                print(f"Sensor {sensor['id']}: {rows} leituras exportadas")
+            except Exception as e:
+                print(f"Sensor {sensor['id']}: falha na exportação ({str(e)})")
+
     def query_specific_sensor(self):
         """Consulta um sensor específico com interação completa"""
         print("\n=== CONSULTAR SENSOR ESPECÍFICO ===")
@@ -53,7 +263,7 @@ class Cliente:
             sub_choice = input("Escolha o tipo de consulta: ")
             
             if sub_choice == "1":
-                data = self.send_command(sensor, "GET_DATA")
+                data = self.get_data(sensor)
                 self.display_sensor_data(sensor["id"], data)
             elif sub_choice == "2":
                 data = self.send_command(sensor, "GET_COORDINATOR")
@@ -80,7 +290,7 @@ class Cliente:
             print(f"\n Sensor {sensor['id']}")
             
             if choice == "1":
-                data = self.send_command(sensor, "GET_DATA")
+                data = self.get_data(sensor)
                 self.display_sensor_data(sensor["id"], data)
             elif choice == "2":
                 data = self.send_command(sensor, "GET_COORDINATOR")
@@ -229,7 +439,11 @@ class Cliente:
             '5': ('Status da rede', self.network_status),
             '6': ('Capturar snapshot global', self.global_snapshot),
             '7': ('Testar detecção de falhas', self.test_failure_detection),
-            '8': ('Sair', self._graceful_exit)
+            '8': ('Consultar canal lógico', self.query_channel),
+            '9': ('Tendência agregada', self.query_trend),
+            '10': ('Registrar regra de alerta', self.register_rule),
+            '11': ('Exportar histórico', self.export_cluster),
+            '12': ('Sair', self._graceful_exit)
         }
 
         while True:
@@ -5,7 +5,7 @@ import os
 from algorit import LamportClock
 
 class Coordinator:
-    def __init__(self, node_id, port, all_nodes):
+    def __init__(self, node_id, port, all_nodes, group=None, log=print, node_host=None):
         self.node_id = node_id
         self.port = port
         self.all_nodes = all_nodes  # Lista de dicionários com host e port
@@ -13,21 +13,44 @@ class Coordinator:
         self.coordinator = None
         self.election_in_progress = False
         self.is_alive = True
+        self.group = group  # Canal multicast opcional (multi.GroupChannel)
+        self.log = log  # Saída dos eventos (o Sensor passa seu registro assíncrono)
+        self.node_host = node_host  # hospedagem.NodeHost: timers e escuta compartilhados em vez de threads
+        self.listener = None
+        self.timers = []
+        if group:
+            group.on("COORDINATOR", self.handle_coordinator_announcement)
         
     def start(self):
         """Inicia os serviços do nó"""
-        threading.Thread(target=self.listen_for_messages, daemon=True).start()
-        threading.Thread(target=self.monitor_coordinator, daemon=True).start()
-        print(f" Nó {self.node_id} iniciado na porta {self.port}")
+        if self.node_host:
+            # Pool próprio da eleição: a resposta ALIVE não espera atrás de pedidos de dados
+            self.listener = self.node_host.serve(self.open_listener(), self.handle_connection,
+                                                 self.node_host.elections)
+            self.timers.append(self.node_host.scheduler.every(10, self.check_coordinator))
+        else:
+            threading.Thread(target=self.listen_for_messages, daemon=True).start()
+            threading.Thread(target=self.monitor_coordinator, daemon=True).start()
+        self.log(f" Nó {self.node_id} iniciado na porta {self.port}")
+
+    def spawn(self, function):
+        """Executa em segundo plano: no pool do host quando hospedado, senão numa thread"""
+        if self.node_host:
+            self.node_host.scheduler.submit(function)
+        else:
+            threading.Thread(target=function, daemon=True).start()
         
     def monitor_coordinator(self):
         """Verifica periodicamente se o coordenador está ativo"""
         while self.is_alive:
             time.sleep(10)
-            if self.coordinator and not self.is_current_coordinator():
-                if not self.check_node_status(self.coordinator['host'], self.coordinator['port']):
-                    print(f" Coordenador {self.coordinator['node_id']} inativo. Iniciando eleição...")
-                    self.start_election()
+            self.check_coordinator()
+
+    def check_coordinator(self):
+        if self.coordinator and not self.is_current_coordinator():
+            if not self.check_node_status(self.coordinator['host'], self.coordinator['port']):
+                self.log(f" Coordenador {self.coordinator['node_id']} inativo. Iniciando eleição...")
+                self.start_election()
 
     def is_current_coordinator(self):
         """Verifica se este nó é o coordenador atual"""
@@ -50,26 +73,32 @@ class Coordinator:
             return
             
         self.election_in_progress = True
-        print(f" Nó {self.node_id} iniciando eleição...")
+        self.log(f" Nó {self.node_id} iniciando eleição...")
         
         # Encontra nós com ID maior
         higher_nodes = [n for n in self.all_nodes if n['node_id'] > self.node_id]
         
         if not higher_nodes:
             # Não há nós superiores, este nó se torna coordenador
-            self.declare_victory()
-        else:
-            # Envia mensagem de ELEICAO para nós superiores
-            responses = []
-            for node in higher_nodes:
-                if self.send_election_message(node['host'], node['port']):
-                    responses.append(node)
+            self.finish_election([])
+            return
             
-            # Se não receber respostas em 3 segundos, declara vitória
+        # Envia mensagem de ELEICAO para nós superiores
+        responses = []
+        for node in higher_nodes:
+            if self.send_election_message(node['host'], node['port']):
+                responses.append(node)
+        
+        # Se não receber respostas em 3 segundos, declara vitória
+        if self.node_host:
+            self.node_host.scheduler.call_later(3, self.finish_election, responses)
+        else:
             time.sleep(3)
-            if not responses:
-                self.declare_victory()
-                
+            self.finish_election(responses)
+
+    def finish_election(self, responses):
+        if not responses:
+            self.declare_victory()
         self.election_in_progress = False
 
     def send_election_message(self, host, port):
@@ -87,16 +116,30 @@ class Coordinator:
         """Declara este nó como o novo coordenador"""
         self.coordinator = {
             'node_id': self.node_id,
-            'host': f"sensor{self.node_id}",
+            'host': self.host_of(self.node_id),
             'port': self.port
         }
-        print(f" Nó {self.node_id} é o novo coordenador!")
+        self.log(f" Nó {self.node_id} é o novo coordenador!")
         
+        if self.group:
+            # Um único datagrama anuncia o coordenador para o grupo inteiro
+            self.group.send("COORDINATOR", self.coordinator)
+            return
+            
         # Notifica todos os nós inferiores
         lower_nodes = [n for n in self.all_nodes if n['node_id'] < self.node_id]
         for node in lower_nodes:
             self.send_coordinator_message(node['host'], node['port'])
 
+    def handle_coordinator_announcement(self, sender, announcement):
+        """Trata o anúncio COORDINATOR recebido pelo grupo multicast"""
+        if announcement['node_id'] < self.node_id:
+            # Pelo Bully um nó maior e ativo não aceita coordenador menor
+            self.spawn(self.start_election)
+            return
+        self.coordinator = announcement
+        self.log(f"Nó {self.node_id} reconhece novo coordenador: Nó {announcement['node_id']}")
+
     def send_coordinator_message(self, host, port):
         """Envia mensagem de COORDENADOR para um nó"""
         try:
@@ -105,49 +148,71 @@ class Coordinator:
                 s.connect((host, port))
                 s.send(f"COORDINATOR {self.node_id} {self.port}".encode())
         except Exception as e:
-            print(f"Erro ao enviar mensagem de coordenador: {str(e)}")
+            self.log(f"Erro ao enviar mensagem de coordenador: {str(e)}")
+
+    def host_of(self, node_id):
+        """Endereço do nó segundo all_nodes (vários nós podem dividir o mesmo host)"""
+        for node in self.all_nodes:
+            if node['node_id'] == node_id:
+                return node['host']
+        return f"sensor{node_id}"
+
+    def open_listener(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(('0.0.0.0', self.port))
+        s.listen()
+        self.log(f" Nó {self.node_id} ouvindo na porta {self.port}")
+        return s
 
     def listen_for_messages(self):
         """Ouve mensagens de outros nós"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind(('0.0.0.0', self.port))
-            s.listen()
-            print(f" Nó {self.node_id} ouvindo na porta {self.port}")
-            
+        with self.open_listener() as s:
             while self.is_alive:
                 try:
                     s.settimeout(1)
                     conn, addr = s.accept()
-                    data = conn.recv(1024).decode()
-                    
-                    if data == "ELECTION":
-                        print(f" Nó {self.node_id} recebeu ELEICAO de {addr}")
-                        conn.send("ALIVE".encode())
-                        if not self.election_in_progress:
-                            self.start_election()
-                            
-                    elif data.startswith("COORDINATOR"):
-                        _, node_id, port = data.split()
-                        self.coordinator = {
-                            'node_id': int(node_id),
-                            'host': f"sensor{node_id}",
-                            'port': int(port)
-                        }
-                        print(f"Nó {self.node_id} reconhece novo coordenador: Nó {node_id}")
-                        
-                    elif data == "PING":
-                        conn.send("PONG".encode())
-                        
-                    conn.close()
+                    self.handle_connection(conn, addr)
                 except socket.timeout:
                     continue
                 except Exception as e:
-                    print(f"Erro na conexão: {str(e)}")
+                    self.log(f"Erro na conexão: {str(e)}")
+
+    def handle_connection(self, conn, addr):
+        try:
+            conn.settimeout(1)
+            data = conn.recv(1024).decode()
+            
+            if data == "ELECTION":
+                self.log(f" Nó {self.node_id} recebeu ELEICAO de {addr}")
+                conn.send("ALIVE".encode())
+                if not self.election_in_progress:
+                    # A eleição própria segue em segundo plano para não travar a escuta
+                    self.spawn(self.start_election)
+                    
+            elif data.startswith("COORDINATOR"):
+                _, node_id, port = data.split()
+                self.coordinator = {
+                    'node_id': int(node_id),
+                    'host': self.host_of(int(node_id)),
+                    'port': int(port)
+                }
+                self.log(f"Nó {self.node_id} reconhece novo coordenador: Nó {node_id}")
+                
+            elif data == "PING":
+                conn.send("PONG".encode())
+        except Exception as e:
+            self.log(f"Erro na conexão: {str(e)}")
+        finally:
+            conn.close()
 
     def stop(self):
         """Para os serviços do nó"""
         self.is_alive = False
+        for timer in self.timers:
+            timer.cancel()
+        if self.listener:
+            self.node_host.listeners.remove(self.listener)
 
 if __name__ == "__main__":
     node_id = int(os.getenv('NODE_ID', 1))
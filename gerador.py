@@ -0,0 +1,45 @@
+import math
+import numpy as np
+
+# Grandezas simuladas, na ordem das colunas dos blocos
+FIELDS = ("temperature", "humidity", "pressure")
+
+# Limites físicos de cada grandeza
+FIELD_LIMITS = {
+    "temperature": (-10.0, 45.0),
+    "humidity": (0.0, 100.0),
+    "pressure": (950.0, 1050.0)
+}
+
+# Variação máxima a cada ~5 segundos (mesma do simulador original)
+FIELD_STEPS = {
+    "temperature": 1.5,
+    "humidity": 3.0,
+    "pressure": 2.0
+}
+
+class SampleGenerator:
+    """Gera blocos de leituras por passeio aleatório vetorizado (NumPy)"""
+
+    def __init__(self, initial, rate_hz=0.2, block_size=1, seed=None):
+        self.rate_hz = rate_hz
+        self.block_size = max(1, block_size)
+        self.block_interval = self.block_size / rate_hz
+        self.rng = np.random.default_rng(seed)
+
+        self.state = np.array([initial.get(f, sum(FIELD_LIMITS[f]) / 2) for f in FIELDS], dtype=np.float64)
+        self.low = np.array([FIELD_LIMITS[f][0] for f in FIELDS])
+        self.high = np.array([FIELD_LIMITS[f][1] for f in FIELDS])
+
+        # Em taxas altas o passo por amostra diminui para manter a mesma variação no tempo
+        step_scale = min(1.0, math.sqrt(1.0 / (5.0 * rate_hz)))
+        self.steps = np.array([FIELD_STEPS[f] for f in FIELDS]) * step_scale
+
+    def next_block(self, start_time):
+        """Retorna (timestamps, valores) com block_size amostras a partir de start_time"""
+        deltas = self.rng.uniform(-1.0, 1.0, (self.block_size, len(FIELDS))) * self.steps
+        values = np.clip(self.state + np.cumsum(deltas, axis=0), self.low, self.high)
+        self.state = values[-1].copy()
+
+        timestamps = start_time + np.arange(self.block_size) / self.rate_hz
+        return timestamps, values
@@ -0,0 +1,107 @@
+import io
+import threading
+import numpy as np
+from gerador import FIELDS
+
+class ReadingBuffer:
+    """Histórico de leituras em colunas NumPy de tamanho fixo (buffer circular)"""
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = {f: np.zeros(capacity, dtype=np.float64) for f in FIELDS}
+        self.count = 0  # Total de leituras já gravadas
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append_block(self, timestamps, values):
+        """Grava um bloco (timestamps, matriz n x campos) de uma só vez"""
+        n = len(timestamps)
+        if n > self.capacity:
+            timestamps, values = timestamps[-self.capacity:], values[-self.capacity:]
+            n = self.capacity
+
+        with self.lock:
+            start = self.count % self.capacity
+            first = min(n, self.capacity - start)
+            self.timestamps[start:start + first] = timestamps[:first]
+            self.timestamps[:n - first] = timestamps[first:]
+            for i, field in enumerate(FIELDS):
+                column = self.values[field]
+                column[start:start + first] = values[:first, i]
+                column[:n - first] = values[first:, i]
+            self.count += n
+
+    def segments(self):
+        """Trechos contíguos do buffer, do mais antigo ao mais recente (sem cópia)"""
+        with self.lock:
+            return self._segments(self.count)
+
+    def _segments(self, count):
+        if count <= self.capacity:
+            return [slice(0, count)]
+        start = count % self.capacity
+        return [slice(start, self.capacity), slice(0, start)]
+
+    def read_range(self, start_time=0.0, end_time=float("inf")):
+        """Leituras com timestamp em [start_time, end_time), como cópias das colunas"""
+        parts = []
+        for seg in self.segments():
+            ts = self.timestamps[seg]
+            mask = (ts >= start_time) & (ts < end_time)
+            parts.append((ts[mask], {f: self.values[f][seg][mask] for f in FIELDS}))
+        timestamps = np.concatenate([p[0] for p in parts])
+        return timestamps, {f: np.concatenate([p[1][f] for p in parts]) for f in FIELDS}
+
+    def select_range(self, start_time=0.0, end_time=float("inf")):
+        """Seleção (contador, [(trecho, linhas)]) do intervalo, feita com o buffer travado"""
+        selection = []
+        with self.lock:
+            count = self.count
+            for seg in self._segments(count):
+                ts = self.timestamps[seg]
+                rows = np.flatnonzero((ts >= start_time) & (ts < end_time))
+                if not len(rows):
+                    continue
+                if rows[-1] - rows[0] + 1 == len(rows):
+                    rows = slice(int(rows[0]), int(rows[-1]) + 1)  # Trecho contíguo
+                selection.append((seg, rows))
+        return count, selection
+
+    @staticmethod
+    def selection_size(selection):
+        return sum(rows.stop - rows.start if isinstance(rows, slice) else len(rows) for _, rows in selection[1])
+
+    def iter_chunks(self, selection, chunk_rows=65536):
+        """Blocos {"timestamp": coluna, campo: coluna} da seleção, copiados com o buffer travado
+
+        Linhas sobrescritas desde a seleção (o buffer deu a volta durante uma exportação
+        longa) são omitidas em vez de trocadas por leituras mais novas.
+        """
+        count, parts = selection
+        for seg, rows in parts:
+            if isinstance(rows, slice):
+                picks = [np.arange(a, min(a + chunk_rows, rows.stop))
+                         for a in range(rows.start, rows.stop, chunk_rows)]
+            else:
+                picks = [rows[a:a + chunk_rows] for a in range(0, len(rows), chunk_rows)]
+            for pick in picks:
+                positions = seg.start + pick
+                # Índice lógico (ordem de escrita) que cada posição tinha no momento da seleção
+                written = count - 1 - (count - 1 - positions) % self.capacity
+                with self.lock:
+                    positions = positions[written >= self.count - self.capacity]
+                    if not len(positions):
+                        continue
+                    chunk = {"timestamp": self.timestamps[positions]}
+                    for field in FIELDS:
+                        chunk[field] = self.values[field][positions]
+                yield chunk
+
+def npy_header(column):
+    """Cabeçalho .npy (versão 1.0) de uma coluna 1-D"""
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, np.lib.format.header_data_from_array_1_0(column))
+    return buffer.getvalue()
\ No newline at end of file
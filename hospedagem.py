@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import json
+import os
+import selectors
+import threading
+import time
+from concurrent import futures
+from multi import MULTICAST_GROUP, MULTICAST_IF, MULTICAST_PORT, open_multicast_receiver
+from registro import shared_logger
+from security import CryptoPool
+from sensor import Sensor, cluster_nodes
+
+class Timer:
+    """Tarefa na fila do Scheduler; cancel() impede as próximas execuções"""
+
+    def __init__(self, function, args, interval=None):
+        self.function = function
+        self.args = args
+        self.interval = interval  # None: executa uma vez só
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class Scheduler:
+    """Heap de prazos com uma thread que dispara as tarefas vencidas num pool compartilhado"""
+
+    def __init__(self, workers=32, log=print):
+        self.executor = futures.ThreadPoolExecutor(workers)
+        self.log = log
+        self.heap = []
+        self.order = itertools.count()  # Desempate entre prazos iguais
+        self.condition = threading.Condition()
+        self.is_running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def call_later(self, delay, function, *args):
+        return self._push(Timer(function, args), delay)
+
+    def every(self, interval, function, *args, delay=None):
+        """Repete a cada `interval` segundos contados do fim da execução anterior (sem sobreposição)"""
+        return self._push(Timer(function, args, interval), interval if delay is None else delay)
+
+    def submit(self, function, *args):
+        return self.executor.submit(self._fire, Timer(function, args))
+
+    def _push(self, timer, delay):
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.order), timer))
+            self.condition.notify()
+        return timer
+
+    def run(self):
+        while self.is_running:
+            with self.condition:
+                now = time.monotonic()
+                if not self.heap or self.heap[0][0] > now:
+                    self.condition.wait(self.heap[0][0] - now if self.heap else 1)
+                    continue
+                _, _, timer = heapq.heappop(self.heap)
+            if not timer.cancelled:
+                self.executor.submit(self._fire, timer)
+
+    def _fire(self, timer):
+        try:
+            timer.function(*timer.args)
+        except Exception as e:
+            self.log(f"Erro na tarefa {getattr(timer.function, '__name__', timer.function)}: {str(e)}")
+        if timer.interval is not None and not timer.cancelled and self.is_running:
+            self._push(timer, timer.interval)
+
+    def stop(self):
+        self.is_running = False
+        with self.condition:
+            self.condition.notify()
+        self.executor.shutdown(wait=False)
+
+class Listeners:
+    """Um único selector atende os sockets de escuta de todos os nós hospedados"""
+
+    def __init__(self, log=print):
+        self.selector = selectors.DefaultSelector()
+        self.log = log
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def add(self, sock, callback):
+        """callback(sock) é chamado na thread do selector sempre que o socket tiver dados"""
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ, callback)
+
+    def remove(self, sock):
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def run(self):
+        while True:
+            for key, _ in self.selector.select(timeout=1):
+                try:
+                    key.data(key.fileobj)
+                except Exception as e:
+                    self.log(f"Erro no socket {key.fd}: {str(e)}")
+
+class GroupHub:
+    """Um socket multicast por processo: cada datagrama é decifrado uma vez e entregue a todos os canais"""
+
+    def __init__(self, node_host, security, group=MULTICAST_GROUP, port=MULTICAST_PORT, interface=MULTICAST_IF):
+        self.security = security
+        self.log = node_host.log
+        self.channels = []
+        self.sock = open_multicast_receiver(group, port, interface)
+        node_host.listeners.add(self.sock, self.receive)
+        node_host.scheduler.every(0.5, self.expire_gaps)
+
+    def attach(self, channel):
+        self.channels = self.channels + [channel]
+
+    def detach(self, channel):
+        self.channels = [c for c in self.channels if c is not channel]
+
+    def receive(self, sock):
+        while True:
+            try:
+                datagram, _ = sock.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                text = self.security.decrypt(datagram)
+            except Exception as e:
+                self.log(f"Datagrama multicast inválido: {str(e)}")
+                continue
+            for channel in self.channels:
+                # Cada canal recebe sua própria cópia (os tratadores podem guardar o payload)
+                try:
+                    channel.handle_message(json.loads(text))
+                except Exception as e:
+                    self.log(f"Erro ao tratar mensagem multicast no nó {channel.node_id}: {str(e)}")
+
+    def expire_gaps(self):
+        for channel in self.channels:
+            channel.expire_gaps()
+
+class NodeHost:
+    """Hospeda vários Sensor/Coordinator num processo com timers, escuta e pools compartilhados"""
+
+    def __init__(self, workers=None, request_workers=None, grpc_workers=None, election_workers=None):
+        self.logger = shared_logger()
+        self.scheduler = Scheduler(workers or int(os.getenv('HOST_WORKERS', 32)), self.log)
+        # Conexões recebidas ficam num pool separado: tarefas agendadas que esperam outro nó
+        # hospedado não ocupam os workers de que a resposta dele depende
+        self.requests = futures.ThreadPoolExecutor(request_workers or int(os.getenv('REQUEST_WORKERS', 32)))
+        # Eleição num pool próprio e pequeno: o ALIVE não fica atrás de pedidos de dados
+        # e a leitura bloqueante não roda na thread do selector
+        self.elections = futures.ThreadPoolExecutor(election_workers or int(os.getenv('ELECTION_WORKERS', 4)))
+        self.listeners = Listeners(self.log)
+        self.grpc_enabled = os.getenv('HOSTED_GRPC', '1') == '1'
+        self.grpc_executor = futures.ThreadPoolExecutor(grpc_workers or int(os.getenv('HOST_GRPC_WORKERS', 16)))
+        self.crypto_pools = {}  # chave -> CryptoPool
+        self.hubs = {}          # chave -> GroupHub
+        self.sensors = []
+        self.lock = threading.Lock()
+
+    def log(self, message):
+        self.logger.emit({"ts": time.time(), "node": "host", "lamport": 0, "level": "INFO", "message": message})
+
+    def serve(self, sock, handler, executor=None):
+        """Registra um socket de escuta; cada conexão aceita vai para handler(conn, addr)
+
+        As conexões são atendidas em `executor` (por padrão o pool de requisições).
+        """
+        executor = executor or self.requests
+        def accept(server):
+            while True:
+                try:
+                    conn, addr = server.accept()
+                except (BlockingIOError, InterruptedError):
+                    return
+                conn.setblocking(True)
+                executor.submit(handler, conn, addr)
+        self.listeners.add(sock, accept)
+        return sock
+
+    def crypto_pool(self, security):
+        with self.lock:
+            if security.key not in self.crypto_pools:
+                self.crypto_pools[security.key] = CryptoPool(
+                    security, int(os.getenv('CRYPTO_WORKERS', 0)) or None, os.getenv('CRYPTO_POOL', 'thread'))
+            return self.crypto_pools[security.key]
+
+    def attach_group(self, channel):
+        with self.lock:
+            if channel.security.key not in self.hubs:
+                self.hubs[channel.security.key] = GroupHub(self, channel.security, channel.group, channel.port,
+                                                           channel.interface)
+            self.hubs[channel.security.key].attach(channel)
+
+    def detach_group(self, channel):
+        hub = self.hubs.get(channel.security.key)
+        if hub:
+            hub.detach(channel)
+
+    def start_cluster(self, ids, address="127.0.0.1"):
+        """Cria um Sensor por ID, todos neste processo, enxergando uns aos outros em `address`"""
+        nodes = cluster_nodes(ids, address)
+        created = [Sensor(node_id, [dict(n) for n in nodes], node_host=self, autostart=False) for node_id in ids]
+        # Só inicia depois que todos existem, do maior ID para o menor: o fast-join tenta
+        # primeiro o maior ID, que assim já está escutando
+        for sensor in reversed(created):
+            sensor.start_services()
+        self.sensors.extend(created)
+        return created
+
+    def stop(self):
+        for sensor in self.sensors:
+            if sensor.is_running:
+                sensor.stop()
+        self.scheduler.stop()
+        self.requests.shutdown(wait=False)
+        self.elections.shutdown(wait=False)
+        self.grpc_executor.shutdown(wait=False)
+        for pool in self.crypto_pools.values():
+            pool.shutdown()
+
+if __name__ == "__main__":
+    count = int(os.getenv('HOSTED_NODES', 10))
+    print(f"\n=== {count} SENSORES HOSPEDADOS NESTE PROCESSO ===")
+    host = NodeHost()
+    host.start_cluster(range(1, count + 1), os.getenv('HOSTED_ADDRESS', '127.0.0.1'))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        host.stop()
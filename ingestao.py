@@ -0,0 +1,97 @@
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+from gerador import FIELDS, FIELD_LIMITS
+
+# Resultados de submit()
+ACCEPTED = "ACK"
+DUPLICATE = "DUPLICATE"
+BUSY = "BUSY"
+INVALID = "INVALID"
+
+class IngestQueue:
+    """Fila limitada de lotes de leituras externas, com deduplicação por (produtor, sequência)"""
+
+    def __init__(self, max_batches=64, max_batch_readings=10000, dedup_window=1024, max_clock_skew=300.0):
+        self.queue = queue.Queue(maxsize=max_batches)
+        self.max_batch_readings = max_batch_readings
+        self.max_clock_skew = max_clock_skew  # Segundos aceitos à frente do relógio local
+        self.dedup_window = dedup_window
+        self.seen = {}  # produtor -> (deque das sequências recentes, set das mesmas)
+        self.lock = threading.Lock()
+        self.listeners = []  # Funções chamadas após cada lote aceito
+        self.low = np.array([FIELD_LIMITS[f][0] for f in FIELDS])
+        self.high = np.array([FIELD_LIMITS[f][1] for f in FIELDS])
+
+    def _is_duplicate(self, producer, seq):
+        recent, members = self.seen.get(producer, ((), ()))
+        if seq in members:
+            return True
+        # Sequências mais antigas que a janela já foram processadas (ou descartadas)
+        return len(recent) == self.dedup_window and seq < min(recent)
+
+    def _mark(self, producer, seq):
+        recent, members = self.seen.setdefault(producer, (deque(), set()))
+        recent.append(seq)
+        members.add(seq)
+        if len(recent) > self.dedup_window:
+            members.discard(recent.popleft())
+
+    def _unmark(self, producer, seq):
+        recent, members = self.seen[producer]
+        if seq in members:
+            recent.remove(seq)
+            members.discard(seq)
+
+    def submit(self, producer, seq, timestamps, columns, timeout=None):
+        """Enfileira um lote; sem timeout responde BUSY na hora se a fila estiver cheia"""
+        # Sequência inteira e produtor nomeado: sem isso a deduplicação descartaria lotes válidos
+        if not isinstance(producer, str) or not producer:
+            return INVALID
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            return INVALID
+        try:
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            columns = [np.asarray(columns[f], dtype=np.float64) for f in FIELDS]
+        except (KeyError, ValueError, TypeError):
+            return INVALID
+        if timestamps.ndim != 1 or any(column.shape != timestamps.shape for column in columns):
+            return INVALID
+        if not 0 < len(timestamps) <= self.max_batch_readings:
+            return INVALID
+        values = np.column_stack(columns)
+        # NaN viraria o estado atual; um timestamp no futuro prenderia os baldes dos rollups
+        if not (np.isfinite(timestamps).all() and np.isfinite(values).all()):
+            return INVALID
+        if timestamps.max() > time.time() + self.max_clock_skew:
+            return INVALID
+
+        order = np.argsort(timestamps, kind="stable")
+        batch = (timestamps[order], np.clip(values[order], self.low, self.high))
+
+        # Reserva a sequência antes de enfileirar: duas cópias do mesmo lote não entram juntas
+        with self.lock:
+            if self._is_duplicate(producer, seq):
+                return DUPLICATE
+            self._mark(producer, seq)
+        try:
+            self.queue.put(batch, block=timeout is not None, timeout=timeout)
+        except queue.Full:
+            with self.lock:
+                self._unmark(producer, seq)
+            return BUSY
+        for listener in self.listeners:
+            listener()
+        return ACCEPTED
+
+    def next_batch(self, timeout=1):
+        """Próximo lote (timestamps, valores) ou None se a fila ficar vazia"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self.queue.qsize()
@@ -1,9 +1,26 @@
 # grpc_handler.py - Adicione este arquivo novo
 import grpc
 from concurrent import futures
+import json
+import os
+import queue
+import socket
+import struct
+import threading
 import time
+from collections import OrderedDict
 import proto_pb2 as pb2
 import proto_pb2_grpc as pb2_grpc
+from historico import npy_header
+from ingestao import ACCEPTED, DUPLICATE, BUSY
+
+INGEST_TIMEOUT = 5  # Segundos de espera por espaço na fila antes de desistir
+
+# Grupo multicast dos sensores (ALERT, COORDINATOR, HEARTBEAT)
+MULTICAST_GROUP = os.getenv('MULTICAST_GROUP', '239.10.0.1')
+MULTICAST_PORT = int(os.getenv('MULTICAST_PORT', 7000))
+MULTICAST_IF = os.getenv('MULTICAST_IF', '0.0.0.0')  # 127.0.0.1 para testes em loopback
+NACK_TIMEOUT = 2  # Segundos esperando retransmissão antes de desistir da lacuna
 
 class SensorGRPC(pb2_grpc.SensorServiceServicer):
     def __init__(self, sensor):
@@ -17,15 +34,251 @@ class SensorGRPC(pb2_grpc.SensorServiceServicer):
             timestamp=self.sensor.relogio_lamport
         )
 
-def iniciar_grpc(sensor):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    def GetDataIfNewer(self, request, context):
+        response = self.sensor.handle_get_data_if_newer(request.versao)
+        if response["status"] == "NOT_MODIFIED":
+            return pb2.DadosCondicionais(id=self.sensor.id, versao=response["version"], modificado=False)
+        
+        changes = response["changes"] if response["status"] == "DELTA" else response["data"]
+        return pb2.DadosCondicionais(
+            id=self.sensor.id,
+            versao=response.get("version", changes.get("version", 0)),
+            modificado=True,
+            alteracoes={k: v for k, v in changes.items() if k != "version"}
+        )
+
+    def Ingest(self, request_iterator, context):
+        resumo = pb2.ResumoIngestao()
+        for lote in request_iterator:
+            columns = {"temperature": lote.temperatura, "humidity": lote.umidade, "pressure": lote.pressao}
+            # Bloqueia enquanto a fila estiver cheia: o controle de fluxo do gRPC segura o produtor
+            status = self.sensor.ingest.submit(lote.produtor, lote.sequencia, lote.timestamps,
+                                               columns, timeout=INGEST_TIMEOUT)
+            if status == ACCEPTED:
+                resumo.confirmados.append(lote.sequencia)
+            elif status == DUPLICATE:
+                resumo.duplicados.append(lote.sequencia)
+            elif status == BUSY:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                              f"Fila de ingestão cheia; reenviar a partir do lote {lote.sequencia}")
+            else:
+                resumo.rejeitados.append(lote.sequencia)
+        return resumo
+
+    def TransferirEstado(self, request, context):
+        for chunk in self.sensor.iter_state_chunks():
+            yield pb2.BlocoEstado(conteudo=chunk)
+
+    def AssinarAlertas(self, request, context):
+        alerts = self.sensor.subscribe_alerts()
+        try:
+            while context.is_active():
+                try:
+                    alert = alerts.get(timeout=1)
+                except queue.Empty:
+                    continue
+                yield pb2.Alerta(
+                    sensor_id=alert["sensor_id"],
+                    regra=alert.get("rule_id", 0),
+                    mensagem=alert["message"],
+                    valor=alert.get("value", 0.0),
+                    timestamp=alert["timestamp"]
+                )
+        finally:
+            self.sensor.unsubscribe_alerts(alerts)
+
+    def Exportar(self, request, context):
+        end_time = request.fim or float("inf")
+        selection = self.sensor.history.select_range(request.inicio, end_time)
+        for chunk in self.sensor.history.iter_chunks(selection, self.sensor.export_chunk_rows):
+            for field, column in chunk.items():
+                yield pb2.BlocoExportacao(campo=field, npy=npy_header(column) + memoryview(column).cast("B"))
+
+def criar_servidor_grpc(sensor, executor=None):
+    """Servidor gRPC já iniciado; nós hospedados no mesmo processo passam um executor comum"""
+    server = grpc.server(executor or futures.ThreadPoolExecutor(max_workers=10))
     pb2_grpc.add_SensorServiceServicer_to_server(SensorGRPC(sensor), server)
     server.add_insecure_port(f'[::]:{50051 + sensor.id}')  # Porta única por sensor
     server.start()
-    
+    return server
+
+def iniciar_grpc(sensor):
+    server = criar_servidor_grpc(sensor)
     print(f"Servidor gRPC do sensor {sensor.id} rodando na porta {50051 + sensor.id}")
     try:
         while True:
             time.sleep(3600)  # Mantém o servidor ativo
     except KeyboardInterrupt:
-        server.stop(0)
\ No newline at end of file
+        server.stop(0)
+
+def open_multicast_receiver(group, port, interface):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('', port))
+    membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(interface))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    return sock
+
+class GroupChannel:
+    """Canal de grupo sobre UDP multicast com sequência, detecção de lacunas e NACK"""
+
+    def __init__(self, node_id, security, group=MULTICAST_GROUP, port=MULTICAST_PORT,
+                 interface=MULTICAST_IF, history=1024, log=print, shared=False):
+        self.node_id = node_id
+        self.security = security
+        self.log = log
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.is_alive = True
+        self.handlers = {}  # tipo -> função(remetente, payload)
+
+        # Encarnação: muda a cada reinício, e a sequência recomeça em 1 junto com ela
+        self.incarnation = time.time_ns()
+        self.seq = 0
+        self.sent = OrderedDict()  # seq -> datagrama, para retransmissão
+        self.history = history
+        self.send_lock = threading.Lock()
+
+        self.incarnations = {}  # remetente -> encarnação atual
+        self.expected = {}  # remetente -> próxima sequência esperada
+        self.pending = {}   # remetente -> {seq: mensagem} fora de ordem
+        self.gap_since = {} # remetente -> momento em que a lacuna foi detectada
+        # Recepção e expiração de lacunas podem rodar em threads diferentes (no modo hospedado,
+        # selector e scheduler): o estado acima só é tocado com esta trava
+        self.recv_lock = threading.Lock()
+
+        self.send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.send_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self.send_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.send_sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+        # Compartilhado: a recepção fica a cargo do processo (hospedagem.GroupHub), que chama handle_message
+        self.recv_sock = None
+        if not shared:
+            self.recv_sock = open_multicast_receiver(group, port, interface)
+            self.recv_sock.settimeout(0.5)
+
+    def on(self, kind, handler):
+        """Registra o tratador de um tipo de mensagem"""
+        self.handlers[kind] = handler
+
+    def start(self):
+        if self.recv_sock:
+            threading.Thread(target=self.listen, daemon=True).start()
+
+    def send(self, kind, payload):
+        """Um único datagrama entrega a mensagem a todo o grupo"""
+        with self.send_lock:
+            self.seq += 1
+            datagram = self._encode({"sender": self.node_id, "incarnation": self.incarnation, "seq": self.seq,
+                                     "type": kind, "payload": payload})
+            self.sent[self.seq] = datagram
+            if len(self.sent) > self.history:
+                self.sent.popitem(last=False)
+        self.send_sock.sendto(datagram, (self.group, self.port))
+
+    def _encode(self, message):
+        return self.security.encrypt(json.dumps(message)).encode()
+
+    def _send_control(self, message):
+        # Mensagens de controle (NACK) não entram na sequência
+        self.send_sock.sendto(self._encode(message), (self.group, self.port))
+
+    def listen(self):
+        while self.is_alive:
+            try:
+                datagram, _ = self.recv_sock.recvfrom(65536)
+                message = json.loads(self.security.decrypt(datagram))
+            except socket.timeout:
+                self.expire_gaps()
+                continue
+            except Exception as e:
+                self.log(f"Datagrama multicast inválido: {str(e)}")
+                continue
+            try:
+                self.handle_message(message)
+            except Exception as e:
+                # Uma mensagem com problema não pode derrubar a única thread de recepção
+                self.log(f"Erro ao tratar mensagem multicast: {str(e)}")
+
+    def handle_message(self, message):
+        if message["type"] == "NACK":
+            # NACK de uma encarnação anterior pediria sequências que hoje são outras mensagens
+            if message["target"] == self.node_id and message.get("incarnation") == self.incarnation:
+                self._retransmit(message["missing"])
+        elif message["sender"] != self.node_id:
+            self._receive(message)
+        self.expire_gaps()
+
+    def _retransmit(self, missing):
+        with self.send_lock:
+            datagrams = [self.sent[seq] for seq in missing if seq in self.sent]
+        for datagram in datagrams:
+            self.send_sock.sendto(datagram, (self.group, self.port))
+
+    def _receive(self, message):
+        with self.recv_lock:
+            sender, seq = message["sender"], message["seq"]
+            incarnation = message.get("incarnation", 0)
+            known = self.incarnations.get(sender)
+            if known is not None and incarnation < known:
+                return  # Sobra de antes do reinício do remetente
+            if incarnation != known:
+                # Remetente (re)iniciado: a numeração recomeça do zero
+                self.incarnations[sender] = incarnation
+                self.expected.pop(sender, None)
+                self.pending.pop(sender, None)
+                self.gap_since.pop(sender, None)
+            expected = self.expected.setdefault(sender, seq)  # Entrou no meio: começa daqui
+            if seq < expected:
+                return  # Duplicada ou retransmissão já entregue
+
+            pending = self.pending.setdefault(sender, {})
+            pending[seq] = message
+            if seq > expected and sender not in self.gap_since:
+                self.gap_since[sender] = time.time()
+                self._send_nack(sender, incarnation, expected, seq, pending)
+            self._deliver_in_order(sender)
+
+    def _deliver_in_order(self, sender):
+        pending = self.pending[sender]
+        while self.expected[sender] in pending:
+            message = pending.pop(self.expected[sender])
+            self.expected[sender] += 1
+            handler = self.handlers.get(message["type"])
+            if handler:
+                try:
+                    handler(sender, message["payload"])
+                except Exception as e:
+                    self.log(f"Erro ao tratar {message['type']} do nó {sender}: {str(e)}")
+        if not pending:
+            self.gap_since.pop(sender, None)
+
+    def expire_gaps(self):
+        """Lacunas sem retransmissão após NACK_TIMEOUT são puladas"""
+        with self.recv_lock:
+            now = time.time()
+            for sender, since in list(self.gap_since.items()):
+                if now - since < NACK_TIMEOUT:
+                    continue
+                pending = self.pending[sender]
+                self.log(f"Mensagens perdidas do nó {sender}: {self.expected[sender]}..{min(pending) - 1}")
+                self.expected[sender] = min(pending)
+                del self.gap_since[sender]
+                self._deliver_in_order(sender)
+                if pending and sender not in self.gap_since:
+                    # Ainda há lacuna depois do trecho entregue: pede de novo
+                    self.gap_since[sender] = now
+                    self._send_nack(sender, self.incarnations[sender], self.expected[sender], max(pending), pending)
+
+    def _send_nack(self, sender, incarnation, start, end, pending):
+        """Pede as sequências [start, end) que faltam, limitadas ao que o remetente ainda guarda"""
+        start = max(start, end - self.history)  # Mais antigas já saíram do histórico de retransmissão
+        self._send_control({"type": "NACK", "sender": self.node_id, "target": sender, "incarnation": incarnation,
+                            "missing": [s for s in range(start, end) if s not in pending]})
+
+    def stop(self):
+        self.is_alive = False
\ No newline at end of file
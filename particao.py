@@ -0,0 +1,95 @@
+import bisect
+import functools
+import hashlib
+
+@functools.lru_cache(maxsize=4096)
+def vnode_positions(node_id, vnodes):
+    """Posições dos nós virtuais de um nó; reaproveitadas por todos os anéis do processo"""
+    return tuple(ConsistentHashRing._hash(f"{node_id}#{i}") for i in range(vnodes))
+
+class ConsistentHashRing:
+    """Anel de hash consistente com nós virtuais e fator de replicação"""
+
+    def __init__(self, nodes=(), vnodes=64, replication_factor=2, epoch=0):
+        self.vnodes = vnodes
+        self.replication_factor = replication_factor
+        self.epoch = epoch  # Incrementada a cada mudança de membros
+        self.nodes = set()
+        self.hashes = []  # Posições ordenadas no anel
+        self.owners = {}  # Posição -> id do nó físico
+        for node_id in nodes:
+            self.nodes.add(node_id)
+            for h in vnode_positions(node_id, vnodes):
+                self.owners.setdefault(h, node_id)
+        self.hashes = sorted(self.owners)  # Uma ordenação só em vez de uma inserção por posição
+
+    @staticmethod
+    def _hash(key):
+        return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+    def _insert(self, node_id):
+        self.nodes.add(node_id)
+        for h in vnode_positions(node_id, self.vnodes):
+            if h not in self.owners:
+                bisect.insort(self.hashes, h)
+                self.owners[h] = node_id
+
+    def add_node(self, node_id):
+        """Adiciona um nó físico (e seus nós virtuais) ao anel"""
+        if node_id in self.nodes:
+            return False
+        self._insert(node_id)
+        self.epoch += 1
+        return True
+
+    def remove_node(self, node_id):
+        """Remove um nó físico do anel"""
+        if node_id not in self.nodes:
+            return False
+        self.nodes.discard(node_id)
+        self.hashes = [h for h in self.hashes if self.owners[h] != node_id]
+        self.owners = {h: self.owners[h] for h in self.hashes}
+        self.epoch += 1
+        return True
+
+    def set_members(self, node_ids):
+        """Ajusta o anel para conter exatamente os nós informados"""
+        node_ids = set(node_ids)
+        changed = False
+        for node_id in self.nodes - node_ids:
+            changed |= self.remove_node(node_id)
+        for node_id in node_ids - self.nodes:
+            changed |= self.add_node(node_id)
+        return changed
+
+    def preference_list(self, key):
+        """Nós responsáveis pela chave, em ordem (o primeiro é o dono)"""
+        if not self.hashes:
+            return []
+        wanted = min(self.replication_factor, len(self.nodes))
+        result = []
+        start = bisect.bisect(self.hashes, self._hash(key))
+        for i in range(len(self.hashes)):
+            node_id = self.owners[self.hashes[(start + i) % len(self.hashes)]]
+            if node_id not in result:
+                result.append(node_id)
+                if len(result) == wanted:
+                    break
+        return result
+
+    def owner(self, key):
+        nodes = self.preference_list(key)
+        return nodes[0] if nodes else None
+
+    def to_dict(self):
+        """Mapa de partições serializável (enviado aos clientes e aos nós)"""
+        return {
+            "nodes": sorted(self.nodes),
+            "vnodes": self.vnodes,
+            "replication_factor": self.replication_factor,
+            "epoch": self.epoch
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["nodes"], data["vnodes"], data["replication_factor"], data["epoch"])
@@ -24,17 +24,37 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0bproto.proto\"\x07\n\x05Vazio\"R\n\x0b\x44\x61\x64osSensor\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x13\n\x0btemperatura\x18\x02 \x01(\x02\x12\x0f\n\x07umidade\x18\x03 \x01(\x02\x12\x11\n\ttimestamp\x18\x04 \x01(\x05\x32\x32\n\rSensorService\x12!\n\x07GetData\x12\x06.Vazio\x1a\x0c.DadosSensor\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0bproto.proto\"\x07\n\x05Vazio\"R\n\x0b\x44\x61\x64osSensor\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x13\n\x0btemperatura\x18\x02 \x01(\x02\x12\x0f\n\x07umidade\x18\x03 \x01(\x02\x12\x11\n\ttimestamp\x18\x04 \x01(\x05\"!\n\x0fVersaoConhecida\x12\x0e\n\x06versao\x18\x01 \x01(\x03\"\xae\x01\n\x11\x44\x61\x64osCondicionais\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0e\n\x06versao\x18\x02 \x01(\x03\x12\x12\n\nmodificado\x18\x03 \x01(\x08\x12\x36\n\nalteracoes\x18\x04 \x03(\x0b\x32\".DadosCondicionais.AlteracoesEntry\x1a\x31\n\x0f\x41lteracoesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"~\n\x0cLoteLeituras\x12\x10\n\x08produtor\x18\x01 \x01(\t\x12\x11\n\tsequencia\x18\x02 \x01(\x03\x12\x12\n\ntimestamps\x18\x03 \x03(\x01\x12\x13\n\x0btemperatura\x18\x04 \x03(\x01\x12\x0f\n\x07umidade\x18\x05 \x03(\x01\x12\x0f\n\x07pressao\x18\x06 \x03(\x01\"M\n\x0eResumoIngestao\x12\x13\n\x0b\x63onfirmados\x18\x01 \x03(\x03\x12\x12\n\nduplicados\x18\x02 \x03(\x03\x12\x12\n\nrejeitados\x18\x03 \x03(\x03\"\x1f\n\x0b\x42locoEstado\x12\x10\n\x08\x63onteudo\x18\x01 \x01(\x0c\"^\n\x06\x41lerta\x12\x11\n\tsensor_id\x18\x01 \x01(\x05\x12\r\n\x05regra\x18\x02 \x01(\x05\x12\x10\n\x08mensagem\x18\x03 \x01(\t\x12\r\n\x05valor\x18\x04 \x01(\x01\x12\x11\n\ttimestamp\x18\x05 \x01(\x01\"2\n\x13IntervaloExportacao\x12\x0e\n\x06inicio\x18\x01 \x01(\x01\x12\x0b\n\x03\x66im\x18\x02 \x01(\x01\"-\n\x0f\x42locoExportacao\x12\r\n\x05\x63\x61mpo\x18\x01 \x01(\t\x12\x0b\n\x03npy\x18\x02 \x01(\x0c\x32\xa7\x02\n\rSensorService\x12!\n\x07GetData\x12\x06.Vazio\x1a\x0c.DadosSensor\"\x00\x12\x38\n\x0eGetDataIfNewer\x12\x10.VersaoConhecida\x1a\x12.DadosCondicionais\"\x00\x12,\n\x06Ingest\x12\r.LoteLeituras\x1a\x0f.ResumoIngestao\"\x00(\x01\x12,\n\x10TransferirEstado\x12\x06.Vazio\x1a\x0c.BlocoEstado\"\x00\x30\x01\x12%\n\x0e\x41ssinarAlertas\x12\x06.Vazio\x1a\x07.Alerta\"\x00\x30\x01\x12\x36\n\x08\x45xportar\x12\x14.IntervaloExportacao\x1a\x10.BlocoExportacao\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'proto_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_DADOSCONDICIONAIS_ALTERACOESENTRY']._loaded_options = None
+  _globals['_DADOSCONDICIONAIS_ALTERACOESENTRY']._serialized_options = b'8\001'
   _globals['_VAZIO']._serialized_start=15
   _globals['_VAZIO']._serialized_end=22
   _globals['_DADOSSENSOR']._serialized_start=24
   _globals['_DADOSSENSOR']._serialized_end=106
-  _globals['_SENSORSERVICE']._serialized_start=108
-  _globals['_SENSORSERVICE']._serialized_end=158
+  _globals['_VERSAOCONHECIDA']._serialized_start=108
+  _globals['_VERSAOCONHECIDA']._serialized_end=141
+  _globals['_DADOSCONDICIONAIS']._serialized_start=144
+  _globals['_DADOSCONDICIONAIS']._serialized_end=318
+  _globals['_DADOSCONDICIONAIS_ALTERACOESENTRY']._serialized_start=269
+  _globals['_DADOSCONDICIONAIS_ALTERACOESENTRY']._serialized_end=318
+  _globals['_LOTELEITURAS']._serialized_start=320
+  _globals['_LOTELEITURAS']._serialized_end=446
+  _globals['_RESUMOINGESTAO']._serialized_start=448
+  _globals['_RESUMOINGESTAO']._serialized_end=525
+  _globals['_BLOCOESTADO']._serialized_start=527
+  _globals['_BLOCOESTADO']._serialized_end=558
+  _globals['_ALERTA']._serialized_start=560
+  _globals['_ALERTA']._serialized_end=654
+  _globals['_INTERVALOEXPORTACAO']._serialized_start=656
+  _globals['_INTERVALOEXPORTACAO']._serialized_end=706
+  _globals['_BLOCOEXPORTACAO']._serialized_start=708
+  _globals['_BLOCOEXPORTACAO']._serialized_end=753
+  _globals['_SENSORSERVICE']._serialized_start=756
+  _globals['_SENSORSERVICE']._serialized_end=1051
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,31 @@ class SensorServiceStub(object):
                 request_serializer=proto__pb2.Vazio.SerializeToString,
                 response_deserializer=proto__pb2.DadosSensor.FromString,
                 _registered_method=True)
+        self.GetDataIfNewer = channel.unary_unary(
+                '/SensorService/GetDataIfNewer',
+                request_serializer=proto__pb2.VersaoConhecida.SerializeToString,
+                response_deserializer=proto__pb2.DadosCondicionais.FromString,
+                _registered_method=True)
+        self.Ingest = channel.stream_unary(
+                '/SensorService/Ingest',
+                request_serializer=proto__pb2.LoteLeituras.SerializeToString,
+                response_deserializer=proto__pb2.ResumoIngestao.FromString,
+                _registered_method=True)
+        self.TransferirEstado = channel.unary_stream(
+                '/SensorService/TransferirEstado',
+                request_serializer=proto__pb2.Vazio.SerializeToString,
+                response_deserializer=proto__pb2.BlocoEstado.FromString,
+                _registered_method=True)
+        self.AssinarAlertas = channel.unary_stream(
+                '/SensorService/AssinarAlertas',
+                request_serializer=proto__pb2.Vazio.SerializeToString,
+                response_deserializer=proto__pb2.Alerta.FromString,
+                _registered_method=True)
+        self.Exportar = channel.unary_stream(
+                '/SensorService/Exportar',
+                request_serializer=proto__pb2.IntervaloExportacao.SerializeToString,
+                response_deserializer=proto__pb2.BlocoExportacao.FromString,
+                _registered_method=True)
 
 
 class SensorServiceServicer(object):
@@ -50,6 +75,36 @@ class SensorServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetDataIfNewer(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Ingest(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TransferirEstado(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AssinarAlertas(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Exportar(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_SensorServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +113,31 @@ def add_SensorServiceServicer_to_server(servicer, server):
                     request_deserializer=proto__pb2.Vazio.FromString,
                     response_serializer=proto__pb2.DadosSensor.SerializeToString,
             ),
+            'GetDataIfNewer': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetDataIfNewer,
+                    request_deserializer=proto__pb2.VersaoConhecida.FromString,
+                    response_serializer=proto__pb2.DadosCondicionais.SerializeToString,
+            ),
+            'Ingest': grpc.stream_unary_rpc_method_handler(
+                    servicer.Ingest,
+                    request_deserializer=proto__pb2.LoteLeituras.FromString,
+                    response_serializer=proto__pb2.ResumoIngestao.SerializeToString,
+            ),
+            'TransferirEstado': grpc.unary_stream_rpc_method_handler(
+                    servicer.TransferirEstado,
+                    request_deserializer=proto__pb2.Vazio.FromString,
+                    response_serializer=proto__pb2.BlocoEstado.SerializeToString,
+            ),
+            'AssinarAlertas': grpc.unary_stream_rpc_method_handler(
+                    servicer.AssinarAlertas,
+                    request_deserializer=proto__pb2.Vazio.FromString,
+                    response_serializer=proto__pb2.Alerta.SerializeToString,
+            ),
+            'Exportar': grpc.unary_stream_rpc_method_handler(
+                    servicer.Exportar,
+                    request_deserializer=proto__pb2.IntervaloExportacao.FromString,
+                    response_serializer=proto__pb2.BlocoExportacao.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'SensorService', rpc_method_handlers)
@@ -95,3 +175,138 @@ class SensorService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetDataIfNewer(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/SensorService/GetDataIfNewer',
+            proto__pb2.VersaoConhecida.SerializeToString,
+            proto__pb2.DadosCondicionais.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Ingest(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/SensorService/Ingest',
+            proto__pb2.LoteLeituras.SerializeToString,
+            proto__pb2.ResumoIngestao.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def TransferirEstado(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/SensorService/TransferirEstado',
+            proto__pb2.Vazio.SerializeToString,
+            proto__pb2.BlocoEstado.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def AssinarAlertas(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/SensorService/AssinarAlertas',
+            proto__pb2.Vazio.SerializeToString,
+            proto__pb2.Alerta.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Exportar(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/SensorService/Exportar',
+            proto__pb2.IntervaloExportacao.SerializeToString,
+            proto__pb2.BlocoExportacao.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,87 @@
+import json
+import queue
+import sys
+import threading
+import time
+
+class AsyncLogger:
+    """Fila limitada de registros escrita por uma única thread; quem loga nunca bloqueia"""
+
+    def __init__(self, capacity=4096, stream=None, fmt="text", batch_size=256):
+        self.records = queue.Queue(maxsize=capacity)
+        self.stream = stream or sys.stdout
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.dropped = 0  # Registros descartados com a fila cheia desde o último aviso
+        self.lock = threading.Lock()
+        threading.Thread(target=self.write_records, daemon=True).start()
+
+    def emit(self, record):
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def format(self, record):
+        if self.fmt == "json":
+            return json.dumps(record, default=str)
+        extra = "".join(f" {k}={v}" for k, v in record.items()
+                        if k not in ("ts", "node", "lamport", "level", "message"))
+        return f"[Sensor {record['node']}][T{record['lamport']}] {record['message']}{extra}"
+
+    def write_records(self):
+        """Escreve os registros em lotes, com um flush por lote"""
+        while True:
+            batch = [self.records.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.records.get_nowait())
+            except queue.Empty:
+                pass
+
+            with self.lock:
+                dropped, self.dropped = self.dropped, 0
+            lines = [self.format(record) for record in batch]
+            if dropped:
+                lines.append(f"[registro] {dropped} registros descartados (fila cheia)")
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                continue
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_logger(capacity=4096, fmt="text"):
+    """Um escritor por processo, compartilhado por todos os nós hospedados nele"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AsyncLogger(capacity, fmt=fmt)
+        return _shared
+
+class AlertLimiter:
+    """Agrupa alertas idênticos: repete no máximo um por janela e conta os suprimidos"""
+
+    def __init__(self, window=60.0, max_keys=1024):
+        self.window = window
+        self.max_keys = max_keys
+        self.last_sent = {}   # mensagem -> momento do último envio
+        self.suppressed = {}  # mensagem -> repetições suprimidas desde o último envio
+        self.lock = threading.Lock()
+
+    def allow(self, message):
+        """Devolve None se o alerta deve ser suprimido, senão quantas repetições foram agrupadas"""
+        now = time.time()
+        with self.lock:
+            if now - self.last_sent.get(message, 0) < self.window:
+                self.suppressed[message] = self.suppressed.get(message, 0) + 1
+                return None
+            if len(self.last_sent) >= self.max_keys:
+                # Esquece as mensagens cuja janela já passou
+                self.last_sent = {m: t for m, t in self.last_sent.items() if now - t < self.window}
+                self.suppressed = {m: c for m, c in self.suppressed.items() if m in self.last_sent}
+            self.last_sent[message] = now
+            return self.suppressed.pop(message, 0)
@@ -0,0 +1,146 @@
+import itertools
+import threading
+from collections import deque
+import numpy as np
+from gerador import FIELDS
+
+# Operadores aceitos nas regras de limiar
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal
+}
+
+class ThresholdRule:
+    """Dispara quando o predicado fica verdadeiro por pelo menos `duration` segundos"""
+
+    def __init__(self, rule_id, spec):
+        self.rule_id = rule_id
+        self.spec = spec
+        self.field = spec["field"]
+        self.predicate = (self.field, spec["op"], float(spec["value"]))
+        self.duration = float(spec.get("for", 0))
+        self.true_since = None
+        self.fired = False
+
+    def describe(self):
+        return f"{self.field} {self.spec['op']} {self.spec['value']} por {self.duration:g}s"
+
+    def evaluate(self, timestamps, values, mask):
+        """Percorre só as transições do bloco (trechos verdadeiros/falsos), não as amostras"""
+        events = []
+        boundaries = np.concatenate(([0], np.flatnonzero(np.diff(mask)) + 1, [len(mask)]))
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            if not mask[start]:
+                self.true_since = None
+                self.fired = False  # Rearma ao sair da condição
+                continue
+            if self.true_since is None:
+                self.true_since = timestamps[start]
+            if not self.fired and timestamps[end - 1] - self.true_since >= self.duration:
+                i = start + np.searchsorted(timestamps[start:end], self.true_since + self.duration)
+                self.fired = True
+                events.append((timestamps[i], values[i]))
+        return events
+
+class ChangeRule:
+    """Dispara quando o campo cai (ou sobe) mais que `amount` dentro de `window` segundos"""
+
+    def __init__(self, rule_id, spec):
+        self.rule_id = rule_id
+        self.spec = spec
+        self.field = spec["field"]
+        self.predicate = None
+        self.amount = float(spec["amount"])
+        self.window = float(spec["window"])
+        self.sign = 1.0 if spec.get("direction", "drop") == "drop" else -1.0
+        # Fila monotônica: o primeiro elemento é o extremo (máx. p/ queda, mín. p/ subida) da janela
+        self.extremes = deque()
+        self.fired = False
+
+    def describe(self):
+        direction = "queda" if self.sign > 0 else "subida"
+        return f"{direction} de {self.field} > {self.amount:g} em {self.window:g}s"
+
+    def evaluate(self, timestamps, values, mask):
+        events = []
+        extremes = self.extremes
+        for ts, value in zip(timestamps.tolist(), (values * self.sign).tolist()):
+            while extremes and extremes[-1][1] <= value:
+                extremes.pop()
+            extremes.append((ts, value))
+            while extremes[0][0] < ts - self.window:
+                extremes.popleft()
+            change = extremes[0][1] - value
+            if change > self.amount and not self.fired:
+                self.fired = True
+                events.append((ts, value * self.sign))
+            elif change <= self.amount:
+                self.fired = False
+        return events
+
+RULE_TYPES = {
+    "threshold": ThresholdRule,
+    "change": ChangeRule
+}
+
+class RuleEngine:
+    """Avalia consultas contínuas a cada bloco, com predicados compartilhados entre regras"""
+
+    def __init__(self):
+        self.rules = {}
+        self.ids = itertools.count(1)
+        self.listeners = []  # Funções chamadas com cada evento disparado
+        self.lock = threading.Lock()
+
+    def add_rule(self, spec):
+        """Registra uma regra; levanta ValueError se a especificação for inválida"""
+        if not isinstance(spec, dict):
+            raise ValueError("Regra inválida: esperado um objeto")
+        rule_type = RULE_TYPES.get(spec.get("type"))
+        if not rule_type or spec.get("field") not in FIELDS:
+            raise ValueError("Regra inválida: tipo ou campo desconhecido")
+        if spec["type"] == "threshold" and spec.get("op") not in OPERATORS:
+            raise ValueError(f"Operador inválido: {spec.get('op')}")
+        try:
+            with self.lock:
+                rule = rule_type(next(self.ids), spec)
+                self.rules[rule.rule_id] = rule
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Regra inválida: {str(e)}")
+        return rule.rule_id
+
+    def remove_rule(self, rule_id):
+        with self.lock:
+            return self.rules.pop(rule_id, None) is not None
+
+    def list_rules(self):
+        with self.lock:
+            return [dict(rule.spec, rule_id=rule.rule_id, description=rule.describe())
+                    for rule in self.rules.values()]
+
+    def evaluate(self, timestamps, values):
+        """Assinante de blocos: cada predicado distinto é calculado uma vez por bloco"""
+        events = []
+        with self.lock:
+            masks = {}
+            for rule in self.rules.values():
+                if rule.predicate and rule.predicate not in masks:
+                    field, op, threshold = rule.predicate
+                    masks[rule.predicate] = OPERATORS[op](values[:, FIELDS.index(field)], threshold)
+
+            for rule in self.rules.values():
+                column = values[:, FIELDS.index(rule.field)]
+                for ts, value in rule.evaluate(timestamps, column, masks.get(rule.predicate)):
+                    events.append({
+                        "rule_id": rule.rule_id,
+                        "description": rule.describe(),
+                        "field": rule.field,
+                        "value": round(float(value), 2),
+                        "timestamp": float(ts)
+                    })
+
+        for event in events:
+            for listener in self.listeners:
+                listener(event)
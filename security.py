@@ -1,6 +1,24 @@
 from cryptography.fernet import Fernet
+from concurrent import futures
 import base64
 import json
+import os
+import queue
+import threading
+
+_worker_cipher = None  # Cifra de cada processo do pool (modo "process")
+
+def _init_worker(key):
+    global _worker_cipher
+    _worker_cipher = Fernet(key)
+
+def _encrypt_batch(items, cipher=None):
+    cipher = cipher or _worker_cipher
+    return [cipher.encrypt(item.encode()).decode() for item in items]
+
+def _decrypt_batch(tokens, cipher=None):
+    cipher = cipher or _worker_cipher
+    return [cipher.decrypt(token.encode()).decode() for token in tokens]
 
 class SecurityHandler:
     def __init__(self, node_id, secret_key):
@@ -19,4 +37,120 @@ class SecurityHandler:
         """Sempre retorna string"""
         if isinstance(encrypted_data, str):
             encrypted_data = encrypted_data.encode()
-        return self.cipher.decrypt(encrypted_data).decode()
\ No newline at end of file
+        return self.cipher.decrypt(encrypted_data).decode()
+
+    def encrypt_bytes(self, data):
+        """Cifra bytes brutos (blocos binários), sem passar por texto"""
+        return self.cipher.encrypt(bytes(data))
+
+    def decrypt_bytes(self, token):
+        return self.cipher.decrypt(token)
+
+class CryptoPool:
+    """Agrupa encrypt/decrypt em lotes e executa num pool do tamanho dos núcleos"""
+
+    def __init__(self, security, workers=None, mode="thread", batch_size=32, timeout=30):
+        self.security = security
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.timeout = timeout  # Espera máxima de quem chama encrypt/decrypt
+        if mode == "process":
+            # Processos escapam do GIL inteiro; a chave é enviada uma vez para cada um
+            self.executor = futures.ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                        initargs=(security.key,))
+            self.cipher = None
+        else:
+            self.executor = futures.ThreadPoolExecutor(self.workers)
+            self.cipher = security.cipher
+        self.jobs = queue.Queue()
+        self.closed = False
+        self.lock = threading.Lock()  # Nenhum pedido entra na fila depois do marcador de encerramento
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def _run(self, function, items):
+        if self.cipher:
+            return self.executor.submit(function, items, self.cipher)
+        return self.executor.submit(function, items)
+
+    def _split(self, items):
+        """Um lote por worker, para a rajada usar o pool inteiro"""
+        size = max(1, -(-len(items) // self.workers))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _map(self, function, items):
+        """Divide os itens em um lote por worker e junta os resultados na ordem"""
+        parts = [self._run(function, part) for part in self._split(items)]
+        return [result for part in parts for result in part.result()]
+
+    def encrypt_many(self, items):
+        return self._map(_encrypt_batch, [json.dumps(i) if isinstance(i, dict) else i for i in items])
+
+    def decrypt_many(self, tokens):
+        return self._map(_decrypt_batch, [t.decode() if isinstance(t, bytes) else t for t in tokens])
+
+    def encrypt(self, data):
+        """Como SecurityHandler.encrypt, mas agrupado com as chamadas concorrentes"""
+        if isinstance(data, dict):
+            data = json.dumps(data)
+        return self._submit(_encrypt_batch, data)
+
+    def decrypt(self, encrypted_data):
+        if isinstance(encrypted_data, bytes):
+            encrypted_data = encrypted_data.decode()
+        return self._submit(_decrypt_batch, encrypted_data)
+
+    def _submit(self, function, item):
+        future = futures.Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("CryptoPool encerrado")
+            self.jobs.put((function, item, future))
+        return future.result(self.timeout)
+
+    def _dispatch(self):
+        """Junta os pedidos já enfileirados (sem esperar por mais) e reparte cada lote entre os workers"""
+        while True:
+            batch = [self.jobs.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.jobs.get_nowait())
+            except queue.Empty:
+                pass
+
+            # O marcador de encerramento pode vir no meio do lote: o que veio antes dele ainda roda
+            stopping = None in batch
+            batch = [job for job in batch if job is not None]
+            for function in (_encrypt_batch, _decrypt_batch):
+                jobs = [job for job in batch if job[0] is function]
+                for part in self._split(jobs):
+                    self._start(function, part)
+            if stopping:
+                self.executor.shutdown(wait=False)  # As tarefas já enviadas terminam normalmente
+                return
+
+    def _start(self, function, jobs):
+        try:
+            task = self._run(function, [item for _, item, _ in jobs])
+        except Exception as e:  # Executor encerrado ou quebrado: quem espera recebe o erro
+            for _, _, future in jobs:
+                future.set_exception(e)
+            return
+        task.add_done_callback(lambda done: self._resolve(done, jobs))
+
+    def _resolve(self, done, jobs):
+        if done.exception() is None:
+            for (_, _, future), result in zip(jobs, done.result()):
+                future.set_result(result)
+            return
+        if len(jobs) == 1:
+            jobs[0][2].set_exception(done.exception())
+            return
+        # Um item inválido (ex.: token adulterado) derruba o lote: refaz um a um para isolar o erro
+        for job in jobs:
+            self._start(job[0], [job])
+
+    def shutdown(self):
+        """Recusa novos pedidos; os enfileirados rodam ou falham, nenhum fica esperando"""
+        with self.lock:
+            self.closed = True
+            self.jobs.put(None)
@@ -4,34 +4,142 @@ import random
 import time
 import json
 import os
+import queue
+import struct
+import numpy as np
+from collections import deque
+from concurrent import futures
+from agregacao import RollupStore
 from algorit import LamportClock
+from antientropia import BandwidthLimiter, MerkleIndex
 from eleicao import Coordinator
-from multi import iniciar_grpc
-from security import SecurityHandler
+from gerador import FIELDS, SampleGenerator
+from historico import ReadingBuffer, npy_header
+from ingestao import IngestQueue, BUSY
+from multi import GroupChannel, criar_servidor_grpc, iniciar_grpc
+from particao import ConsistentHashRing
+from registro import AlertLimiter, shared_logger
+from regras import RuleEngine
+from security import CryptoPool, SecurityHandler
+
+# Campos da leitura que participam das respostas delta
+DATA_FIELDS = ("temperature", "humidity", "pressure", "last_updated")
+
+# Sondas em texto puro (healthcheck do Docker), respondidas sem criptografia
+PROBES = ("READY", "HEALTHCHECK")
+PROBE_BYTES = tuple(p.encode() for p in PROBES)
+PROBE_MAX = max(len(p) for p in PROBE_BYTES)
+
+# Tipos de bloco da transferência de estado: JSON ou colunas binárias do histórico
+STATE_JSON = b"J"
+STATE_HISTORY = b"H"
+EXPORT_NPY = b"N"  # Bloco .npy de uma coluna na exportação
+
+def cluster_nodes(ids, address=None):
+    """Configuração de rede dos nós; com `address` todos ficam no mesmo host (portas por ID)"""
+    return [{'id': i, 'host': address or f'sensor{i}', 'data_port': 5000 + i, 'election_port': 6000 + i,
+             'status': 'unknown'} for i in ids]
 
 class Sensor:
-    def __init__(self, sensor_id):
+    def __init__(self, sensor_id, nodes=None, node_host=None, autostart=True):
         self.id = sensor_id
+        self.node_host = node_host  # hospedagem.NodeHost: vários nós no mesmo processo, sem threads próprias
+        self.timers = []  # Timers no scheduler do host (modo hospedado)
+        self.listener = None
+        self.grpc_server = None
         self.hostname = f"sensor{sensor_id}"
         self.is_running = True
+        self.ready = threading.Event()  # Setado quando o nó já serve dados corretos
+        
+        # Configuração da rede
+        self.nodes = nodes or cluster_nodes((1, 2, 3))
         
-        # Configurações de portas
-        self.data_port = int(os.getenv('DATA_PORT', 5000 + sensor_id))
-        self.election_port = int(os.getenv('ELECTION_PORT', 6000 + sensor_id))
+        # Configurações de portas; hospedado, cada nó usa as da sua entrada em `nodes`
+        # (as variáveis de ambiente valem para o processo inteiro e fariam todos disputar a mesma porta)
+        own = self.node_by_id(sensor_id) if node_host else None
+        if own:
+            self.data_port = own['data_port']
+            self.election_port = own['election_port']
+        else:
+            self.data_port = int(os.getenv('DATA_PORT', 5000 + sensor_id))
+            self.election_port = int(os.getenv('ELECTION_PORT', 6000 + sensor_id))
         self.grpc_port = int(os.getenv('GRPC_PORT', 50050 + sensor_id))
         
         # Componentes do sistema
         self.clock = LamportClock()
         self.data_lock = threading.Lock()
-        self.election_log = []
+        
+        # Registro assíncrono: fila limitada, uma thread escritora e alertas repetidos agrupados
+        self.logger = shared_logger(int(os.getenv('LOG_QUEUE_SIZE', 4096)), os.getenv('LOG_FORMAT', 'text'))
+        self.election_log = deque(maxlen=int(os.getenv('ELECTION_LOG_SIZE', 256)))
+        self.alert_limiter = AlertLimiter(float(os.getenv('ALERT_REPEAT_WINDOW', 60)))
+        self.received_alerts = AlertLimiter(float(os.getenv('ALERT_REPEAT_WINDOW', 60)))
+        # Últimas versões dos dados, usadas para responder leituras condicionais com delta
+        self.version_history = deque(maxlen=int(os.getenv('VERSION_HISTORY', 32)))
         self.security = SecurityHandler(sensor_id, os.getenv('SECURITY_KEY'))
         
-        # Configuração da rede
-        self.nodes = [
-            {'id': 1, 'host': 'sensor1', 'data_port': 5001, 'election_port': 6001, 'status': 'unknown'},
-            {'id': 2, 'host': 'sensor2', 'data_port': 5002, 'election_port': 6002, 'status': 'unknown'},
-            {'id': 3, 'host': 'sensor3', 'data_port': 5003, 'election_port': 6003, 'status': 'unknown'}
-        ]
+        # Conexões atendidas em paralelo: a cripto roda no pool, o processamento segue serializado
+        if node_host:
+            self.crypto = node_host.crypto_pool(self.security)
+            self.request_pool = node_host.requests
+        else:
+            self.crypto = CryptoPool(self.security, int(os.getenv('CRYPTO_WORKERS', 0)) or None,
+                                     os.getenv('CRYPTO_POOL', 'thread'))
+            self.request_pool = futures.ThreadPoolExecutor(int(os.getenv('REQUEST_WORKERS', 8)))
+        self.process_lock = threading.Lock()
+        
+        # Geração e armazenamento das leituras em blocos
+        self.sample_rate = float(os.getenv('SAMPLE_RATE_HZ', 0.2))
+        self.sample_block_size = int(os.getenv('SAMPLE_BLOCK_SIZE', 1))
+        self.history = ReadingBuffer(int(os.getenv('HISTORY_CAPACITY', 100000)))
+        self.state_chunk_rows = int(os.getenv('STATE_CHUNK_ROWS', 20000))
+        self.export_chunk_rows = int(os.getenv('EXPORT_CHUNK_ROWS', 65536))
+        self.block_listeners = []  # Assinantes chamados com (timestamps, valores) de cada bloco
+        self.rollups = RollupStore()
+        self.block_listeners.append(self.rollups.update)
+        
+        # Consultas contínuas avaliadas a cada bloco; eventos vão por ALERT e pelas assinaturas
+        self.rules = RuleEngine()
+        self.rules.listeners.append(self.handle_rule_event)
+        self.block_listeners.append(self.rules.evaluate)
+        self.alert_subscribers = []  # Filas das assinaturas de alertas (gRPC)
+        self.subscribers_lock = threading.Lock()
+        self.ingest = IngestQueue(
+            max_batches=int(os.getenv('INGEST_QUEUE_SIZE', 64)),
+            max_batch_readings=int(os.getenv('INGEST_MAX_BATCH', 10000)),
+            max_clock_skew=float(os.getenv('INGEST_MAX_SKEW', 300))
+        )
+        self.ingest_lock = threading.Lock()  # Mantém a ordem de chegada quando há vários drenos
+        
+        # Canais lógicos particionados por hash consistente
+        self.channels = {}  # canal -> {timestamp_ms: valor}
+        self.channel_lock = threading.Lock()
+        self.rebalance_lock = threading.Lock()  # Uma troca de época de cada vez
+        self.pending_handoffs = {}  # canal -> novos responsáveis que ainda não receberam a cópia
+        self.ring = ConsistentHashRing(
+            [n['id'] for n in self.nodes],
+            vnodes=int(os.getenv('VNODES', 64)),
+            replication_factor=int(os.getenv('REPLICATION_FACTOR', 2))
+        )
+        
+        # Anti-entropia: árvore de Merkle sobre (canal, intervalo) e orçamento de banda
+        self.merkle = MerkleIndex()
+        self.merkle_cache = {}  # id do par -> (rodada, (geração, época), árvore)
+        self.anti_entropy_interval = float(os.getenv('ANTI_ENTROPY_INTERVAL', 30))
+        self.anti_entropy_limiter = BandwidthLimiter(int(os.getenv('ANTI_ENTROPY_BPS', 256 * 1024)))
+        
+        # Comunicação em grupo (multicast); sem ela os envios voltam a ser TCP nó a nó
+        self.heartbeat_interval = float(os.getenv('HEARTBEAT_INTERVAL', 2))
+        self.last_heartbeat = {}  # id do nó -> momento do último HEARTBEAT recebido
+        try:
+            self.group = GroupChannel(self.id, self.security, log=self.log, shared=bool(node_host))
+            self.group.on("ALERT", lambda sender, message: self.handle_alert(f"ALERT:{message}"))
+            self.group.on("HEARTBEAT", self.handle_group_heartbeat)
+            if node_host:
+                node_host.attach_group(self.group)
+        except OSError as e:
+            self.log(f"Multicast indisponível, usando TCP: {str(e)}")
+            self.group = None
         
         # Inicialização dos dados
         self.initialize_sensor_data()
@@ -39,8 +147,9 @@ class Sensor:
         # Módulo de eleição
         self.initialize_election_module()
         
-        # Inicia todos os serviços
-        self.start_services()
+        # Inicia todos os serviços (o host adia para depois de criar todos os nós do processo)
+        if autostart:
+            self.start_services()
 
     def initialize_sensor_data(self):
         with self.data_lock:
@@ -51,93 +160,378 @@ class Sensor:
                 "last_updated": time.time(),  # Timestamp atual
                 "version": 1
             }
+            self.record_version()
+
+    def record_version(self):
+        """Guarda a versão atual no histórico (chamar com data_lock adquirido)"""
+        self.version_history.append((self.data['version'], {f: self.data[f] for f in DATA_FIELDS}))
 
     def initialize_election_module(self):
         election_nodes = [{'node_id': n['id'], 'host': n['host'], 'port': n['election_port']} 
                          for n in self.nodes]
-        self.coordinator = Coordinator(self.id, self.election_port, election_nodes)
+        self.coordinator = Coordinator(self.id, self.election_port, election_nodes, self.group, self.log,
+                                       self.node_host)
 
     def start_services(self):
+        if self.node_host:
+            self.start_hosted_services()
+            return
+            
         services = [
             self.handle_data_requests,
+            self.join_cluster,
             self.simulate_data_changes,
+            self.process_ingest_queue,
             self.monitor_nodes,
             self.start_election_service,
             self.start_grpc_service,
-            self.replicate_data_periodically
+            self.replicate_data_periodically,
+            self.anti_entropy
         ]
         
+        if self.group:
+            self.group.start()
+            services.append(self.send_heartbeats)
+            
         for service in services:
             threading.Thread(target=service, daemon=True).start()
 
+    def start_hosted_services(self):
+        """Os mesmos serviços como timers e sockets do NodeHost, em vez de uma thread cada"""
+        scheduler = self.node_host.scheduler
+        self.listener = self.node_host.serve(self.open_listener(), self.handle_connection)
+        self.ingest.listeners.append(lambda: scheduler.submit(self.drain_ingest_queue))
+        self.timers.append(scheduler.every(10, self.check_cluster))
+        self.timers.append(scheduler.every(15, self.replicate_if_coordinator))
+        self.timers.append(scheduler.every(self.anti_entropy_interval, self.reconcile_random_peer))
+        if self.group:
+            self.timers.append(scheduler.every(self.heartbeat_interval, self.send_heartbeat, delay=0))
+        if self.node_host.grpc_enabled:
+            self.grpc_server = criar_servidor_grpc(self, self.node_host.grpc_executor)
+        scheduler.submit(self.join_hosted)
+
+    def join_hosted(self):
+        self.join_cluster()
+        self.start_election_service()
+        self.start_generator()
+        self.timers.append(self.node_host.scheduler.every(self.generator.block_interval, self.generate_due_blocks))
+
+    def send_heartbeats(self):
+        """Anuncia ao grupo que este nó está vivo"""
+        while self.is_running:
+            self.send_heartbeat()
+            time.sleep(self.heartbeat_interval)
+
+    def send_heartbeat(self):
+        self.group.send("HEARTBEAT", {"timestamp": self.clock.get_time(), "version": self.data['version']})
+
+    def handle_group_heartbeat(self, sender, heartbeat):
+        self.last_heartbeat[sender] = time.time()
+
     def simulate_data_changes(self):
-        """Atualiza dados com variações graduais e realistas"""
+        """Gera leituras em blocos com variações graduais e realistas"""
+        self.ready.wait()  # Continua a partir do estado recebido do cluster
+        self.start_generator()
         while self.is_running:
-            time.sleep(random.uniform(4, 6))  # Intervalo entre 4-6 segundos
+            # Espera o bloco "acontecer"; se atrasar, gera sem dormir para alcançar o relógio
+            time.sleep(max(0.0, self.block_start + self.generator.block_interval - time.time()))
+            self.generate_due_blocks()
+
+    def start_generator(self):
+        with self.data_lock:
+            initial = self.data.copy()
+        self.generator = SampleGenerator(initial, self.sample_rate, self.sample_block_size)
+        self.block_start = time.time()
+
+    def generate_due_blocks(self):
+        """Publica todos os blocos cujo intervalo já terminou"""
+        while self.block_start + self.generator.block_interval <= time.time():
+            timestamps, values = self.generator.next_block(self.block_start)
+            self.block_start += self.generator.block_interval
+            self.publish_block(timestamps, values)
+
+    def publish_block(self, timestamps, values):
+        """Entrega um bloco ao histórico, ao estado replicado e aos assinantes"""
+        self.history.append_block(timestamps, values)
         
+        # Um único lock por bloco: o estado atual é a última amostra
         with self.data_lock:
-            # Garante valores iniciais válidos
-            current_temp = self.data.get('temperature', 20.0)
-            current_humidity = self.data.get('humidity', 50.0)
-            current_pressure = self.data.get('pressure', 1013.0)
+            # Lote retroativo (backfill) vai só para histórico e assinantes: o estado não volta no tempo
+            if timestamps[-1] >= self.data['last_updated']:
+                last = values[-1]
+                version = self.data['version'] + len(timestamps)
+                self.data = {field: round(float(last[i]), 1) for i, field in enumerate(FIELDS)}
+                self.data['last_updated'] = float(timestamps[-1])
+                self.data['version'] = version
+                self.record_version()
             
-            new_data = {
-                "temperature": current_temp + random.uniform(-1.5, 1.5),
-                "humidity": current_humidity + random.uniform(-3.0, 3.0),
-                "pressure": current_pressure + random.uniform(-2.0, 2.0),
-                "last_updated": time.time(),
-                "version": self.data['version'] + 1
-            }
-            
-            # Aplica limites físicos
-            new_data['temperature'] = max(-10.0, min(45.0, new_data['temperature']))
-            new_data['humidity'] = max(0.0, min(100.0, new_data['humidity']))
-            new_data['pressure'] = max(950.0, min(1050.0, new_data['pressure']))
-            
-            # Atualiza com arredondamento
-            self.data = {k: round(v, 1) for k, v in new_data.items()}
+        for listener in self.block_listeners:
+            try:
+                listener(timestamps, values)
+            except Exception as e:
+                self.log(f"Erro em assinante de leituras: {str(e)}")
+
+    def process_ingest_queue(self):
+        """Publica os lotes recebidos de produtores externos, na ordem de chegada"""
+        while self.is_running:
+            batch = self.ingest.next_batch(timeout=1)
+            if batch is not None:
+                self.publish_block(*batch)
+
+    def drain_ingest_queue(self):
+        """Modo hospedado: publica o que já está na fila (disparado a cada lote aceito)"""
+        with self.ingest_lock:
+            batch = self.ingest.next_batch(timeout=0)
+            while batch is not None:
+                self.publish_block(*batch)
+                batch = self.ingest.next_batch(timeout=0)
 
     def start_grpc_service(self):
         iniciar_grpc(self)
 
     def start_election_service(self):
-        time.sleep(2)
+        self.ready.wait()
         self.coordinator.start()
+        if not self.coordinator.coordinator:
+            # Nenhum par informou o coordenador: o Bully decide
+            self.coordinator.start_election()
 
-    def handle_data_requests(self):
+    def join_cluster(self):
+        """Fast-join: puxa o estado completo de um par antes de se declarar pronto"""
+        started = time.time()
+        # Pelo Bully o coordenador tende a ser o maior ID: tenta ele primeiro
+        peers = sorted((n for n in self.nodes if n['id'] != self.id), key=lambda n: -n['id'])
+        for node in peers:
+            try:
+                self.pull_state(node)
+                self.log(f"Estado recebido do nó {node['id']} em {time.time() - started:.2f}s")
+                break
+            except Exception as e:
+                self.log(f"Transferência de estado do nó {node['id']} falhou: {str(e)}")
+        self.ready.set()
+
+    def iter_state_chunks(self):
+        """Estado do nó em blocos: metadados, canais e histórico (colunas float64)"""
+        with self.data_lock:
+            data = self.data.copy()
+        yield STATE_JSON + json.dumps({
+            "type": "meta",
+            "sensor_id": self.id,
+            "data": data,
+            "partition_map": self.ring.to_dict(),
+            "coordinator": self.coordinator.coordinator
+        }).encode()
+        
+        with self.channel_lock:
+            channels = {c: sorted(series.items()) for c, series in self.channels.items()}
+        batch, size = {}, 0
+        for channel, readings in channels.items():
+            batch[channel] = readings
+            size += len(readings)
+            if size >= self.state_chunk_rows:
+                yield STATE_JSON + json.dumps({"type": "channels", "channels": batch}).encode()
+                batch, size = {}, 0
+        if batch:
+            yield STATE_JSON + json.dumps({"type": "channels", "channels": batch}).encode()
+            
+        timestamps, columns = self.history.read_range()
+        for start in range(0, len(timestamps), self.state_chunk_rows):
+            rows = slice(start, start + self.state_chunk_rows)
+            block = np.stack([timestamps[rows]] + [columns[f][rows] for f in FIELDS])
+            yield STATE_HISTORY + block.tobytes()
+            
+        yield STATE_JSON + json.dumps({"type": "end"}).encode()
+
+    def iter_export_chunks(self, start_time, end_time):
+        """Exportação colunar: cabeçalho JSON e um bloco .npy por campo, lido direto do histórico"""
+        selection = self.history.select_range(start_time, end_time)
+        yield STATE_JSON + json.dumps({
+            "type": "header",
+            "sensor_id": self.id,
+            "rows": self.history.selection_size(selection),
+            "fields": ["timestamp", *FIELDS]
+        }).encode()
+        
+        sent = 0
+        for chunk in self.history.iter_chunks(selection, self.export_chunk_rows):
+            sent += len(chunk["timestamp"])
+            for field, column in chunk.items():
+                name = field.encode()
+                # memoryview das colunas: nenhum objeto Python por linha
+                yield [EXPORT_NPY, struct.pack("!B", len(name)), name, npy_header(column),
+                       memoryview(column).cast("B")]
+                
+        # Menos linhas que no cabeçalho: as mais antigas foram sobrescritas durante a exportação
+        yield STATE_JSON + json.dumps({"type": "end", "rows": sent}).encode()
+
+    def open_stream(self, message):
+        """Comandos respondidos com vários frames em vez de um único JSON"""
+        payload = json.loads(message) if message.startswith("{") else {"command": message}
+        if payload.get("command") == "STATE_TRANSFER":
+            if not self.ready.is_set():
+                # Ainda com o estado aleatório da partida: quem está entrando tenta o próximo par
+                return iter([STATE_JSON + json.dumps({"type": "not_ready", "sensor_id": self.id}).encode()])
+            return self.iter_state_chunks()
+        if payload.get("command") == "EXPORT":
+            return self.iter_export_chunks(payload.get("start", 0.0), payload.get("end", float("inf")))
+        return None
+
+    def send_frames(self, conn, chunks):
+        """Envia frames [tamanho de 4 bytes][bloco cifrado]"""
+        for chunk in chunks:
+            if isinstance(chunk, list):
+                chunk = b"".join(chunk)  # Única cópia do bloco, exigida pela cifra
+            token = self.security.encrypt_bytes(chunk)
+            conn.sendall(struct.pack("!I", len(token)))
+            conn.sendall(token)
+
+    def pull_state(self, node, timeout=1):
+        """Recebe e aplica o estado transmitido por STATE_TRANSFER"""
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            s.bind(('0.0.0.0', self.data_port))
-            s.listen(5)
+            s.settimeout(timeout)
+            s.connect((node['host'], node['data_port']))
+            s.sendall(self.security.encrypt("STATE_TRANSFER").encode())
+            s.shutdown(socket.SHUT_WR)
             
+            stream = s.makefile("rb")
+            while True:
+                header = stream.read(4)
+                if len(header) < 4:
+                    raise Exception("Transferência interrompida")
+                chunk = self.security.decrypt_bytes(stream.read(struct.unpack("!I", header)[0]))
+                if not self.apply_state_chunk(chunk):
+                    return
+
+    def apply_state_chunk(self, chunk):
+        """Aplica um bloco do estado recebido ao entrar no cluster; retorna False no fim da transferência"""
+        kind, body = chunk[:1], chunk[1:]
+        if kind == STATE_HISTORY:
+            block = np.frombuffer(body, dtype=np.float64).reshape(1 + len(FIELDS), -1)
+            self.history.append_block(block[0], block[1:].T)
+            return True
+            
+        message = json.loads(body)
+        if message["type"] == "not_ready":
+            raise Exception(f"nó {message['sensor_id']} ainda não está pronto")
+        if message["type"] == "meta":
+            with self.data_lock:
+                # Versão igual (ex.: os dois acabaram de iniciar em 1): vale a do par, não a aleatória local
+                if message["data"]["version"] >= self.data['version']:
+                    self.data = message["data"]
+                    self.record_version()
+            if message["partition_map"]["epoch"] > self.ring.epoch:
+                self.ring = ConsistentHashRing.from_dict(message["partition_map"])
+            if message["coordinator"] and not self.coordinator.coordinator:
+                self.coordinator.coordinator = message["coordinator"]
+        elif message["type"] == "channels":
+            for channel, readings in message["channels"].items():
+                if self.id in self.ring.preference_list(channel):
+                    self.merge_channel(channel, readings)
+        return message["type"] != "end"
+
+    def open_listener(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(('0.0.0.0', self.data_port))
+        s.listen(64)
+        return s
+
+    def handle_data_requests(self):
+        with self.open_listener() as s:
             while self.is_running:
                 try:
                     s.settimeout(1)
                     conn, addr = s.accept()
-                    raw_data = conn.recv(4096).decode().strip()
-                    
-                    if raw_data:
-                        try:
-                            decrypted_data = self.security.decrypt(raw_data)
-                            response = self.process_message(decrypted_data)
-                            encrypted_response = self.security.encrypt(json.dumps(response))
-                            conn.send(encrypted_response.encode())
-                        except Exception as e:
-                            self.log(f"Erro de segurança: {str(e)}")
-                            conn.send(json.dumps({"error": "security_error"}).encode())
-                    conn.close()
+                    self.request_pool.submit(self.handle_connection, conn, addr)
                 except socket.timeout:
                     continue
                 except Exception as e:
                     self.log(f"Erro na conexão: {str(e)}")
 
+    def handle_connection(self, conn, addr=None):
+        try:
+            raw_data = self.recv_message(conn).decode().strip()
+            
+            if raw_data in PROBES:
+                conn.send(json.dumps(self.process_message(raw_data)).encode())
+            elif raw_data:
+                try:
+                    decrypted_data = self.crypto.decrypt(raw_data)
+                    chunks = self.open_stream(decrypted_data)
+                    if chunks is not None:
+                        self.send_frames(conn, chunks)
+                        return
+                    with self.process_lock:
+                        response = self.process_message(decrypted_data)
+                    encrypted_response = self.crypto.encrypt(json.dumps(response))
+                    conn.send(encrypted_response.encode())
+                except Exception as e:
+                    self.log(f"Erro de segurança: {str(e)}")
+                    conn.send(json.dumps({"error": "security_error"}).encode())
+        except Exception as e:
+            self.log(f"Erro na conexão: {str(e)}")
+        finally:
+            conn.close()
+
+    def recv_message(self, conn, timeout=2):
+        """Lê a mensagem inteira (até o fim do envio ou o timeout)"""
+        conn.settimeout(timeout)
+        chunks = []
+        size = 0
+        try:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+                # Sondas não fecham o envio: responde sem esperar o timeout (só testa mensagens curtas)
+                if size <= PROBE_MAX and b"".join(chunks) in PROBE_BYTES:
+                    break
+        except socket.timeout:
+            pass
+        return b"".join(chunks)
+
+    def send_to_node(self, node, message, timeout=2, encrypted=None):
+        """Envia uma mensagem cifrada a outro nó e devolve a resposta decifrada
+        
+        `encrypted` permite reaproveitar o mesmo token para vários destinatários.
+        """
+        if encrypted is None:
+            encrypted = self.crypto.encrypt(message)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect((node['host'], node['data_port']))
+            s.sendall(encrypted.encode())
+            s.shutdown(socket.SHUT_WR)  # Sinaliza o fim da mensagem
+            return json.loads(self.crypto.decrypt(self.recv_message(s, timeout)))
+
+    def node_by_id(self, node_id):
+        return next((n for n in self.nodes if n['id'] == node_id), None)
+
     def process_message(self, raw_data):
         self.clock.increment()
         
+        # Aceita também o envelope JSON enviado pelo Cliente: {"command": ..., <args>}
+        payload = {}
+        if raw_data.startswith("{"):
+            payload = json.loads(raw_data)
+            raw_data = payload.get("command", "")
+        
         if raw_data == "GET_DATA":
             return self.handle_get_data()
+        elif raw_data.startswith("GET_DATA_IF_NEWER"):
+            known_version = payload.get("version", raw_data.partition(":")[2] or 0)
+            try:
+                known_version = int(known_version)
+            except (TypeError, ValueError):
+                # Pedido malformado não é erro de segurança: responde explicitamente
+                return {"error": "invalid_request", "field": "version"}
+            return self.handle_get_data_if_newer(known_version)
         elif raw_data == "HEALTHCHECK":
             return self.handle_healthcheck()
+        elif raw_data == "READY":
+            return self.handle_ready()
         elif raw_data == "HEARTBEAT":
             return {"status": "ALIVE", "timestamp": self.clock.get_time()}
         elif raw_data.startswith("ALERT:"):
@@ -148,6 +542,30 @@ class Sensor:
             return self.take_snapshot()
         elif raw_data.startswith("REPLICATE:"):
             return self.handle_replication(raw_data)
+        elif raw_data == "INGEST":
+            return self.handle_ingest(payload)
+        elif raw_data == "ROLLUP_QUERY":
+            return self.handle_rollup_query(payload)
+        elif raw_data == "RULE_ADD":
+            return self.handle_rule_add(payload)
+        elif raw_data == "RULE_LIST":
+            return {"status": "OK", "rules": self.rules.list_rules()}
+        elif raw_data == "RULE_DELETE":
+            return {"status": "OK" if self.rules.remove_rule(payload.get("rule_id")) else "NOT_FOUND"}
+        elif raw_data == "CHANNEL_PUT":
+            return self.handle_channel_put(payload)
+        elif raw_data == "CHANNEL_GET":
+            return self.handle_channel_get(payload)
+        elif raw_data == "PARTITION_MAP":
+            return {"status": "OK", "partition_map": self.ring.to_dict()}
+        elif raw_data == "PARTITION_MAP_UPDATE":
+            return self.handle_partition_map_update(payload)
+        elif raw_data == "MERKLE_NODES":
+            return self.handle_merkle_nodes(payload)
+        elif raw_data == "MERKLE_LEAVES":
+            return self.handle_merkle_leaves(payload)
+        elif raw_data == "RANGE_GET":
+            return self.handle_range_get(payload)
         elif raw_data == "START_ELECTION":
             self.coordinator.start_election()
             return {"status": "election_started"}
@@ -162,6 +580,15 @@ class Sensor:
             "version": self.data['version']
         }
 
+    def handle_ready(self):
+        """Sonda de prontidão: só fica READY após receber o estado do cluster"""
+        return {
+            "status": "READY" if self.ready.is_set() else "NOT_READY",
+            "sensor_id": self.id,
+            "version": self.data['version'],
+            "coordinator": self.coordinator.coordinator
+        }
+
     def handle_get_data(self):
         with self.data_lock:
           return {
@@ -178,12 +605,96 @@ class Sensor:
             "coordinator": self.coordinator.coordinator
         }
 
+    def handle_get_data_if_newer(self, known_version):
+        """Leitura condicional: nada, só os campos alterados ou os dados completos"""
+        with self.data_lock:
+            current_version = self.data['version']
+            if known_version == current_version:
+                return {"status": "NOT_MODIFIED", "version": current_version}
+            
+            known = next((fields for version, fields in self.version_history
+                          if version == known_version), None)
+            if known is not None:
+                changes = {f: self.data[f] for f in DATA_FIELDS if self.data[f] != known[f]}
+                return {
+                    "status": "DELTA",
+                    "sensor_id": self.id,
+                    "version": current_version,
+                    "changes": changes
+                }
+        
+        # Versão desconhecida (antiga demais ou de outro nó): envia tudo
+        response = self.handle_get_data()
+        response["status"] = "FULL"
+        return response
+
+    def handle_ingest(self, payload):
+        """Recebe um lote colunar {"timestamps": [...], "temperature": [...], ...}"""
+        status = self.ingest.submit(payload.get("producer"), payload.get("seq"),
+                                    payload.get("timestamps"), payload)
+        response = {"status": status, "seq": payload.get("seq"), "queue_depth": self.ingest.depth()}
+        if status == BUSY:
+            # Backpressure: o produtor deve reenviar o mesmo lote depois
+            response["retry_after"] = 0.5
+        return response
+
+    def handle_rollup_query(self, payload):
+        """Série agregada de um campo; a camada é escolhida pela resolução pedida"""
+        if payload.get("field") not in FIELDS:
+            return {"error": "invalid_field"}
+        end_time = payload.get("end", time.time())
+        result = self.rollups.query(payload["field"], payload.get("start", end_time - 3600), end_time,
+                                    payload.get("resolution", 60))
+        result.update({"status": "OK", "sensor_id": self.id, "field": payload["field"]})
+        return result
+
     def handle_alert(self, raw_data):
         alert = raw_data.split(":", 1)[1]
-        self.log(f"ALERTA: {alert}")
-        self.election_log.append(f"[{time.ctime()}] Alerta recebido: {alert}")
+        if self.received_alerts.allow(alert) is not None:
+            self.log(f"ALERTA: {alert}", level="WARNING")
+        self.election_log.append({"ts": time.time(), "lamport": self.clock.get_time(), "alert": alert})
+        self.publish_alert({"sensor_id": 0, "message": alert, "timestamp": time.time()})
         return {"status": "alert_received"}
 
+    def handle_rule_event(self, event):
+        """Regra disparada: avisa o grupo e as assinaturas locais"""
+        message = f"Sensor {self.id}: {event['description']} (valor {event['value']})"
+        self.log(f"Regra {event['rule_id']} disparada: {message}")
+        self.broadcast_alert(message)
+        self.publish_alert(dict(event, sensor_id=self.id, message=message))
+
+    def subscribe_alerts(self, maxsize=100):
+        alerts = queue.Queue(maxsize=maxsize)
+        with self.subscribers_lock:
+            self.alert_subscribers.append(alerts)
+        return alerts
+
+    def unsubscribe_alerts(self, alerts):
+        with self.subscribers_lock:
+            self.alert_subscribers.remove(alerts)
+
+    def publish_alert(self, alert):
+        with self.subscribers_lock:
+            subscribers = list(self.alert_subscribers)
+        for alerts in subscribers:
+            # Assinante lento perde os alertas mais antigos, nunca trava quem publica
+            while True:
+                try:
+                    alerts.put_nowait(alert)
+                    break
+                except queue.Full:
+                    try:
+                        alerts.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def handle_rule_add(self, payload):
+        try:
+            rule_id = self.rules.add_rule(payload.get("rule", {}))
+        except ValueError as e:
+            return {"status": "ERROR", "error": str(e)}
+        return {"status": "OK", "rule_id": rule_id}
+
     def handle_timestamp(self, raw_data):
         received_time = int(raw_data.split(":")[1])
         self.clock.update(received_time)
@@ -201,48 +712,303 @@ class Sensor:
     def handle_replication(self, raw_data):
         encrypted_data = raw_data.split(":", 1)[1]
         try:
-            decrypted_data = json.loads(self.security.decrypt(encrypted_data))
+            decrypted_data = json.loads(self.crypto.decrypt(encrypted_data))
             
             with self.data_lock:
-                if decrypted_data.get('version', 0) > self.data['version']:
-                    self.data.update(decrypted_data)
-                    self.data['last_updated'] = time.time()
-                    return {"status": "ACK"}
-            return {"status": "NACK"}
+                if decrypted_data.get('version', 0) <= self.data['version']:
+                    return {"status": "NACK"}
+                self.data.update(decrypted_data)
+                self.data['last_updated'] = time.time()
+                self.record_version()
+                timestamps = np.array([self.data['last_updated']])
+                values = np.array([[self.data[f] for f in FIELDS]], dtype=np.float64)
+                
+            # Leitura replicada também alimenta agregados e regras (fora do lock: regras podem alertar)
+            self.rollups.update(timestamps, values)
+            self.rules.evaluate(timestamps, values)
+            return {"status": "ACK"}
         except Exception as e:
             self.log(f"Erro na replicação: {str(e)}")
             return {"status": "ERROR"}
 
+    def wrong_node_response(self, channel):
+        return {
+            "status": "WRONG_NODE",
+            "owners": self.ring.preference_list(channel),
+            "partition_map": self.ring.to_dict()
+        }
+
+    def handle_channel_put(self, payload):
+        """Grava leituras [timestamp_ms, valor] de um canal e replica às demais réplicas"""
+        channel = payload["channel"]
+        owners = self.ring.preference_list(channel)
+        if self.id not in owners:
+            return self.wrong_node_response(channel)
+            
+        readings = payload.get("readings", [])
+        self.merge_channel(channel, readings)
+        
+        targets = [] if payload.get("replica") else [node_id for node_id in owners if node_id != self.id]
+        if targets:
+            # Fora do process_lock: dois responsáveis replicando um para o outro não se esperam
+            self.run_in_background(self.replicate_channel, channel, readings, targets)
+        return {"status": "ACK", "replicas": 1, "pending_replicas": len(targets), "epoch": self.ring.epoch}
+
+    def replicate_channel(self, channel, readings, targets):
+        """Envia as leituras gravadas às demais réplicas (a anti-entropia cobre as falhas)"""
+        put = self.crypto.encrypt({"command": "CHANNEL_PUT", "channel": channel, "readings": readings, "replica": True})
+        for node_id in targets:
+            try:
+                self.send_to_node(self.node_by_id(node_id), None, encrypted=put)
+            except Exception as e:
+                self.log(f"Falha ao replicar canal {channel} para nó {node_id}: {str(e)}")
+
+    def merge_channel(self, channel, readings):
+        """União idempotente das leituras (mesmo timestamp = mesma leitura)"""
+        with self.channel_lock:
+            series = self.channels.setdefault(channel, {})
+            for ts, value in readings:
+                # Conflito no mesmo timestamp: o maior valor vence, em qualquer ordem de chegada
+                ts = int(ts)
+                series[ts] = max(value, series.get(ts, value))
+            self.merkle.mark_dirty(channel, (ts for ts, _ in readings))
+
+    def handle_channel_get(self, payload):
+        channel = payload["channel"]
+        if self.id not in self.ring.preference_list(channel):
+            return self.wrong_node_response(channel)
+            
+        since = payload.get("since", 0)
+        with self.channel_lock:
+            series = self.channels.get(channel, {})
+            readings = sorted((ts, v) for ts, v in series.items() if ts >= since)
+        return {"status": "OK", "channel": channel, "readings": readings, "epoch": self.ring.epoch}
+
+    def handle_partition_map_update(self, payload):
+        """Adota o mapa de partições do coordenador se for mais novo"""
+        new_map = payload["partition_map"]
+        if new_map["epoch"] <= self.ring.epoch:
+            return {"status": "NACK", "epoch": self.ring.epoch}
+        previous, self.ring = self.ring, ConsistentHashRing.from_dict(new_map)
+        # As transferências podem esperar timeouts: confirma o mapa já e transfere em segundo plano
+        self.run_in_background(self.rebalance_channels, previous)
+        return {"status": "ACK", "epoch": self.ring.epoch}
+
+    def run_in_background(self, function, *args):
+        if self.node_host:
+            self.node_host.scheduler.submit(function, *args)
+        else:
+            threading.Thread(target=function, args=args, daemon=True).start()
+
+    def update_ring_membership(self):
+        """Coordenador: recalcula os membros do anel e divulga o novo mapa"""
+        members = [n['id'] for n in self.nodes if n['id'] == self.id or n['status'] != 'offline']
+        previous = ConsistentHashRing.from_dict(self.ring.to_dict())
+        if not self.ring.set_members(members):
+            return
+            
+        self.log(f"Mapa de partições atualizado (época {self.ring.epoch}): nós {members}")
+        update = self.crypto.encrypt({"command": "PARTITION_MAP_UPDATE", "partition_map": self.ring.to_dict()})
+        for node_id in members:
+            if node_id == self.id:
+                continue
+            try:
+                self.send_to_node(self.node_by_id(node_id), None, encrypted=update)
+            except Exception as e:
+                self.log(f"Falha ao enviar mapa de partições ao nó {node_id}: {str(e)}")
+        self.rebalance_channels(previous)
+
+    def rebalance_channels(self, previous):
+        """Transfere só os canais cujos responsáveis mudaram em relação ao anel anterior"""
+        with self.rebalance_lock:
+            with self.channel_lock:
+                held = list(self.channels)
+            for channel in held:
+                self.rebalance_channel(channel, previous.preference_list(channel))
+
+    def rebalance_channel(self, channel, old_owners):
+        owners = self.ring.preference_list(channel)
+        if owners != old_owners:
+            # Quem já era responsável tem o canal; só os novos responsáveis recebem a cópia
+            targets = {node_id for node_id in owners if node_id != self.id and node_id not in old_owners}
+            self.pending_handoffs[channel] = self.pending_handoffs.get(channel, set()) | targets
+        if channel in self.pending_handoffs:
+            self.hand_off(channel)
+
+    def hand_off(self, channel):
+        """Envia o canal aos responsáveis pendentes; a cópia local só sai quando todos receberam
+        
+        Chamar com rebalance_lock adquirido.
+        """
+        owners = self.ring.preference_list(channel)
+        targets = [node_id for node_id in self.pending_handoffs.pop(channel) if node_id in owners]
+        failed = set()
+        if targets:
+            with self.channel_lock:
+                readings = sorted(self.channels.get(channel, {}).items())
+            handoff = self.crypto.encrypt({
+                "command": "CHANNEL_PUT", "channel": channel,
+                "readings": readings, "replica": True
+            })
+            for node_id in targets:
+                try:
+                    response = self.send_to_node(self.node_by_id(node_id), None, encrypted=handoff)
+                    if response.get("status") != "ACK":
+                        raise Exception(f"resposta {response.get('status')}")
+                except Exception as e:
+                    self.log(f"Falha ao transferir canal {channel} para nó {node_id}: {str(e)}")
+                    failed.add(node_id)
+        if failed:
+            self.pending_handoffs[channel] = failed  # Mantém a cópia e tenta de novo no próximo ciclo
+        elif self.id not in owners:
+            with self.channel_lock:
+                self.channels.pop(channel, None)
+                self.merkle.mark_channel_dirty(channel)
+
+    def retry_handoffs(self):
+        """Repete as transferências de canal que falharam"""
+        with self.rebalance_lock:
+            for channel in list(self.pending_handoffs):
+                self.hand_off(channel)
+
+    def shared_with(self, node_id):
+        """Filtro dos canais replicados tanto neste nó quanto em node_id"""
+        ring = self.ring
+        def include(channel):
+            owners = ring.preference_list(channel)
+            return self.id in owners and node_id in owners
+        return include
+
+    def merkle_tree(self, node_id, round_id):
+        """Árvore dos canais compartilhados com node_id, fixa durante toda a rodada de reconciliação
+        
+        Escritas no meio da rodada ficam para a próxima; entre rodadas a árvore só é
+        reconstruída se alguma folha ou o mapa de partições mudou.
+        """
+        cached = self.merkle_cache.get(node_id)
+        if cached and round_id is not None and cached[0] == round_id:
+            return cached[2]
+        with self.channel_lock:
+            self.merkle.refresh(self.channels)
+            key = (self.merkle.generation, self.ring.epoch)
+            if cached and cached[1] == key:
+                tree = cached[2]
+            else:
+                tree = self.merkle.build(self.shared_with(node_id))
+        self.merkle_cache[node_id] = (round_id, key, tree)
+        return tree
+
+    def handle_merkle_nodes(self, payload):
+        """Hashes dos nós pedidos em um nível da árvore compartilhada com o solicitante"""
+        if payload["epoch"] != self.ring.epoch:
+            return {"status": "EPOCH_MISMATCH", "epoch": self.ring.epoch}
+        levels, _ = self.merkle_tree(payload["peer"], payload.get("round"))
+        level = levels[payload["level"]]
+        return {"status": "OK", "hashes": [level[i] for i in payload["indexes"]]}
+
+    def handle_merkle_leaves(self, payload):
+        _, slots = self.merkle_tree(payload["peer"], payload.get("round"))
+        return {"status": "OK", "leaves": [leaf for slot in payload["slots"] for leaf in slots.get(slot, [])]}
+
+    def handle_range_get(self, payload):
+        """Leituras de (canal, intervalo) pedidas pela anti-entropia"""
+        return {"status": "OK", "ranges": [[channel, bucket, self.bucket_readings(channel, bucket)]
+                                           for channel, bucket in payload["ranges"]]}
+
+    def bucket_readings(self, channel, bucket):
+        with self.channel_lock:
+            return sorted((ts, v) for ts, v in self.channels.get(channel, {}).items()
+                          if self.merkle.bucket(ts) == bucket)
+
+    def anti_entropy(self):
+        """Reconcilia periodicamente os canais com um par escolhido ao acaso"""
+        while self.is_running:
+            time.sleep(self.anti_entropy_interval)
+            self.reconcile_random_peer()
+
+    def reconcile_random_peer(self):
+        peers = [n for n in self.nodes if n['id'] != self.id and n['id'] in self.ring.nodes]
+        if not peers:
+            return
+        node = random.choice(peers)
+        try:
+            pulled, pushed = self.reconcile_with(node)
+            if pulled or pushed:
+                self.log(f"Anti-entropia com nó {node['id']}: {pulled} intervalos recebidos, {pushed} enviados")
+        except Exception as e:
+            self.log(f"Falha na anti-entropia com nó {node['id']}: {str(e)}")
+
+    def reconcile_with(self, node):
+        """Desce pela árvore de Merkle só onde os hashes divergem e troca esses intervalos"""
+        # Identificador da rodada: os dois lados usam a mesma árvore em todos os níveis e nas folhas
+        round_id = f"{self.id}:{time.time_ns()}"
+        levels, slots = self.merkle_tree(node['id'], round_id)
+        request = {"command": "MERKLE_NODES", "peer": self.id, "epoch": self.ring.epoch, "round": round_id}
+        
+        indexes = [0]
+        for depth in range(len(levels)):
+            response = self.send_to_node(node, dict(request, level=depth, indexes=indexes))
+            if response.get("status") != "OK":
+                return 0, 0  # Mapas de partição diferentes: tenta na próxima rodada
+            differing = [i for i, h in zip(indexes, response["hashes"]) if h != levels[depth][i]]
+            if not differing:
+                return 0, 0
+            if depth < len(levels) - 1:
+                indexes = [child for i in differing for child in (2 * i, 2 * i + 1)]
+        
+        response = self.send_to_node(node, {"command": "MERKLE_LEAVES", "peer": self.id, "round": round_id,
+                                            "slots": differing})
+        theirs = {(c, b): d for c, b, d in response["leaves"]}
+        ours = {(c, b): d for slot in differing for c, b, d in slots.get(slot, [])}
+        
+        # Recebe o que o par tem de diferente...
+        pull = [[c, b] for (c, b), d in theirs.items() if ours.get((c, b)) != d]
+        for start in range(0, len(pull), 64):
+            response = self.send_to_node(node, {"command": "RANGE_GET", "ranges": pull[start:start + 64]})
+            for channel, bucket, readings in response["ranges"]:
+                self.anti_entropy_limiter.consume(len(json.dumps(readings)))
+                self.merge_channel(channel, readings)
+        
+        # ...e envia o que este nó tem de diferente (a união resolve os dois lados)
+        push = [(c, b) for (c, b), d in ours.items() if theirs.get((c, b)) != d]
+        for channel, bucket in push:
+            readings = self.bucket_readings(channel, bucket)
+            self.anti_entropy_limiter.consume(len(json.dumps(readings)))
+            self.send_to_node(node, {"command": "CHANNEL_PUT", "channel": channel,
+                                     "readings": readings, "replica": True})
+        return len(pull), len(push)
+
     def replicate_data_periodically(self):
         while self.is_running:
             time.sleep(15)
-            if self.coordinator.is_current_coordinator():
-                with self.data_lock:
-                    data_to_replicate = self.data.copy()
-                
-                success = self.replicate_data(data_to_replicate)
-                if success:
-                    self.log("Dados replicados com sucesso para a maioria dos nós")
-                else:
-                    self.log("Falha ao replicar dados para a maioria dos nós")
+            self.replicate_if_coordinator()
+
+    def replicate_if_coordinator(self):
+        if self.coordinator.is_current_coordinator():
+            with self.data_lock:
+                data_to_replicate = self.data.copy()
+            
+            success = self.replicate_data(data_to_replicate)
+            if success:
+                self.log("Dados replicados com sucesso para a maioria dos nós")
+            else:
+                self.log("Falha ao replicar dados para a maioria dos nós")
 
     def replicate_data(self, data):
         success_count = 0
-        encrypted_data = self.security.encrypt(json.dumps(data))
+        encrypted_data = self.crypto.encrypt(json.dumps(data))
+        # O mesmo payload vai para todos os nós: cifra o envelope uma única vez
+        message = self.crypto.encrypt(f"REPLICATE:{encrypted_data}")
         
         for node in self.nodes:
             if node['id'] == self.id:
                 continue
                 
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.settimeout(2)
-                    s.connect((node['host'], node['data_port']))
-                    s.send(f"REPLICATE:{encrypted_data}".encode())
-                    response = json.loads(s.recv(1024).decode())
-                    if response.get("status") == "ACK":
-                        success_count += 1
-                        node['status'] = 'online'
+                response = self.send_to_node(node, None, encrypted=message)
+                if response.get("status") == "ACK":
+                    success_count += 1
+                    node['status'] = 'online'
             except Exception as e:
                 node['status'] = 'offline'
                 self.log(f"Falha na replicação para nó {node['id']}: {str(e)}")
@@ -252,10 +1018,15 @@ class Sensor:
     def monitor_nodes(self):
         while self.is_running:
             time.sleep(10)
-            if self.coordinator.is_current_coordinator():
-                self.check_nodes_health()
-            else:
-                self.verify_coordinator()
+            self.check_cluster()
+
+    def check_cluster(self):
+        if self.coordinator.is_current_coordinator():
+            self.check_nodes_health()
+        else:
+            self.verify_coordinator()
+        if self.pending_handoffs:
+            self.retry_handoffs()
 
     def check_nodes_health(self):
         active_nodes = 0
@@ -264,17 +1035,21 @@ class Sensor:
                 active_nodes += 1
                 continue
                 
+            # HEARTBEAT recente pelo multicast dispensa a sondagem TCP
+            if time.time() - self.last_heartbeat.get(node['id'], 0) < 3 * self.heartbeat_interval:
+                active_nodes += 1
+                node['status'] = 'online'
+                continue
+                
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.settimeout(2)
-                    s.connect((node['host'], node['data_port']))
-                    s.send("HEARTBEAT".encode())
-                    if json.loads(s.recv(1024).decode()).get("status") == "ALIVE":
-                        active_nodes += 1
-                        node['status'] = 'online'
+                if self.send_to_node(node, "HEARTBEAT").get("status") == "ALIVE":
+                    active_nodes += 1
+                    node['status'] = 'online'
             except:
                 node['status'] = 'offline'
                 
+        self.update_ring_membership()
+        
         if active_nodes < len(self.nodes) - 1:
             self.broadcast_alert("AVISO: Múltiplas falhas detectadas")
 
@@ -295,22 +1070,49 @@ class Sensor:
             self.coordinator.start_election()
 
     def broadcast_alert(self, message):
+        # Alertas idênticos (ex.: a cada ciclo de monitoramento durante uma falha) saem uma vez por janela
+        repeated = self.alert_limiter.allow(message)
+        if repeated is None:
+            return
+        if repeated:
+            message = f"{message} (repetido {repeated}x)"
+            
+        if self.group:
+            self.group.send("ALERT", message)
+            return
+            
+        alert = self.crypto.encrypt(f"ALERT:{message}")
         for node in self.nodes:
             if node['id'] != self.id:
                 try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.settimeout(1)
-                        s.connect((node['host'], node['data_port']))
-                        s.send(f"ALERT:{message}".encode())
+                    self.send_to_node(node, None, timeout=1, encrypted=alert)
                 except:
                     continue
 
-    def log(self, message):
-        print(f"[Sensor {self.id}][T{self.clock.get_time()}] {message}")
+    def log(self, message, level="INFO", **fields):
+        """Enfileira um registro estruturado; nunca bloqueia quem chama"""
+        record = {"ts": time.time(), "node": self.id, "lamport": self.clock.get_time(),
+                  "level": level, "message": message}
+        record.update(fields)
+        self.logger.emit(record)
 
     def stop(self):
         self.is_running = False
         self.coordinator.stop()
+        if self.node_host:
+            # Pools e sockets compartilhados continuam servindo os outros nós do processo
+            for timer in self.timers:
+                timer.cancel()
+            self.node_host.listeners.remove(self.listener)
+            if self.group:
+                self.node_host.detach_group(self.group)
+            if self.grpc_server:
+                self.grpc_server.stop(0)
+        else:
+            self.request_pool.shutdown(wait=False)
+            self.crypto.shutdown()
+        if self.group:
+            self.group.stop()
         print(f"\n Sensor {self.id} encerrado")
 
 if __name__ == "__main__":